@@ -0,0 +1,67 @@
+"""
+Benchmarks for `gradient_descent.py`
+
+    python gradient_descent_bench.py
+
+Each benchmark runs in a fresh interpreter, so module import times are not
+hidden by modules that are already loaded.
+"""
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+# `gradient_descent.py` sits next to this file
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import numpy
+t1 = time.perf_counter()
+import gradient_descent
+t2 = time.perf_counter()
+print(json.dumps({
+    "numpy": t1 - t0,
+    "gradient_descent": t2 - t1,
+    "loaded": [m for m in ("matplotlib", "torch") if m in sys.modules],
+}))
+"""
+
+
+def bench_import(repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time `import gradient_descent` in fresh interpreters
+
+    Returns
+    -------
+    result: Dict[str, Any]
+        The best of `repeat` times (seconds) for importing NumPy and then
+        `gradient_descent`, and the heavy modules (matplotlib, torch) that
+        the import pulled in, which should be none
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=_HERE,
+        )
+        runs.append(json.loads(out.stdout))
+    return {
+        "numpy": min(r["numpy"] for r in runs),
+        "gradient_descent": min(r["gradient_descent"] for r in runs),
+        "loaded": sorted({m for r in runs for m in r["loaded"]}),
+    }
+
+
+if __name__ == "__main__":
+    result = bench_import()
+    print(f"import numpy:            {result['numpy'] * 1e3:6.1f} ms")
+    print(f"import gradient_descent: {result['gradient_descent'] * 1e3:6.1f} ms")
+    if result["loaded"]:
+        print("heavy modules imported:", ", ".join(result["loaded"]))
+        sys.exit(1)
@@ -1,9 +1,23 @@
 import abc
-import copy
-from collections import Counter
+from collections import Counter, deque
+from itertools import combinations_with_replacement
+import os
 import random
 import time
-from typing import Dict, List, Tuple, NamedTuple, Optional
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 
 
 class Action(NamedTuple):
@@ -22,6 +36,212 @@ BANKRUPT = Action(tuple(), "bankrupt", 0)
 ROLL = Action(tuple(), "roll", 0)
 STOP = Action(tuple(), "stop", 0)
 
+# `Farkle.play` records this action at the start of each turn. It plays no
+# dice and only resets `can_roll` to 6
+_START_TURN = Action(tuple(), "roll", 0)
+
+
+def _compute_scoring_options(values: Sequence[int]) -> Tuple[Action, ...]:
+    """
+    Compute all of the ways that a collection of dice values can score
+
+    This is the work behind `scoring_options`. It is only called once per
+    dice multiset, when the lookup table is built.
+    """
+    dice_counts = Counter(values)
+    opportunities: List[Action] = []
+
+    # Single dice opportunities
+    if dice_counts[1] > 0:
+        opportunities.append(Action((1,), "1", 100))
+
+    if dice_counts[5] > 0:
+        opportunities.append(Action((5,), "5", 50))
+
+    # Three pairs
+    pairs = []
+    pairs_playable = []
+    for i in range(1, 7):
+        if dice_counts[i] >= 2:
+            pairs.append(i)
+            pairs_playable.extend([i] * 2)
+    if len(pairs) == 3:
+        opportunities.append(Action(tuple(pairs_playable), f"Three pairs", 1500))
+
+    # Three of a kind
+    if dice_counts[1] >= 3:
+        opportunities.append(Action((1, 1, 1), "Three 1's", 1000))
+    for i in range(2, 7):
+        if dice_counts[i] >= 3:
+            opportunities.append(Action((i, i, i), f"Three {i}'s", i * 100))
+
+    for i in range(1, 7):
+        # Four of a kind
+        if dice_counts[i] >= 4:
+            opportunities.append(Action(tuple([i] * 4), f"Four {i}'s", 1000))
+
+        # Five of a kind
+        if dice_counts[i] >= 5:
+            opportunities.append(Action(tuple([i] * 5), f"Five {i}'s", 2000))
+
+        # Six of a kind
+        if dice_counts[i] == 6:
+            opportunities.append(Action(tuple([i] * 6), f"Six {i}'s", 3000))
+
+    # Straight
+    if all([dice_counts[i] > 0 for i in range(1, 7)]):
+        opportunities.append(Action(tuple(range(1, 7)), "1-2-3-4-5-6", 3000))
+
+    return tuple(opportunities)
+
+
+# Maps a sorted tuple of dice values to its scoring options. There are only
+# 924 such tuples (including the empty one), so we build the table once on
+# first use and every later lookup is a single dict access
+_SCORING_TABLE: Optional[Dict[Tuple[int, ...], Tuple[Action, ...]]] = None
+
+
+def _build_scoring_table() -> Dict[Tuple[int, ...], Tuple[Action, ...]]:
+    global _SCORING_TABLE
+    table = {}
+    for n in range(7):
+        for dice in combinations_with_replacement(range(1, 7), n):
+            table[dice] = _compute_scoring_options(dice)
+    _SCORING_TABLE = table
+    return table
+
+
+def scoring_options(dice: Tuple[int, ...]) -> Tuple[Action, ...]:
+    """
+    Look up the ways that a sorted tuple of dice values can score
+
+    Parameters
+    ----------
+    dice: Tuple[int, ...]
+        The dice values, in sorted order (as stored in `State.dice`)
+
+    Returns
+    -------
+    options : Tuple[Action, ...]
+        The scoring actions, not including ROLL, STOP, or BANKRUPT
+    """
+    table = _SCORING_TABLE
+    if table is None:
+        table = _build_scoring_table()
+    return table[dice]
+
+
+_ACTION_SPACE: Optional[Tuple[Action, ...]] = None
+
+
+def action_space() -> Tuple[Action, ...]:
+    """
+    Every action a player can take, in a fixed order
+
+    The order is BANKRUPT, ROLL, STOP and then each distinct scoring action
+    sorted by the dice it uses. The position of an action in this tuple
+    is its integer id in array-based code (e.g. `farkle_batch`).
+    """
+    global _ACTION_SPACE
+    if _ACTION_SPACE is None:
+        table = _SCORING_TABLE
+        if table is None:
+            table = _build_scoring_table()
+        scoring = {a for options in table.values() for a in options}
+        ordered = sorted(scoring, key=lambda a: (len(a.used), a.used))
+        _ACTION_SPACE = (BANKRUPT, ROLL, STOP, *ordered)
+    return _ACTION_SPACE
+
+
+def pack_dice(dice: Sequence[int]) -> int:
+    """
+    Pack dice values into one integer
+
+    Digit `k - 1` of the base-7 representation of the result is the number
+    of dice showing `k`. See `unpack_dice` for the inverse.
+    """
+    return sum(7 ** (k - 1) for k in dice)
+
+
+def unpack_dice(packed: int) -> Tuple[int, ...]:
+    """The sorted dice values packed by `pack_dice`"""
+    out = []
+    for k in range(1, 7):
+        packed, n = divmod(packed, 7)
+        out.extend([k] * n)
+    return tuple(out)
+
+
+class DiceRNG:
+    """
+    A fast, seedable source of dice rolls and random choices for Farkle
+
+    Values are drawn from a `numpy.random.Generator` in large blocks and
+    handed out from a buffer, which is much cheaper per draw than calling
+    `random.randint` once per die. Two `DiceRNG` objects created with the
+    same seed produce the same sequence of rolls and choices.
+
+    Parameters
+    ----------
+    seed: optional
+        Anything accepted by `numpy.random.default_rng`
+    buffer_size: int, default=4096
+        The number of values drawn from the generator at a time
+    """
+
+    def __init__(self, seed=None, buffer_size: int = 4096):
+        self.generator = np.random.default_rng(seed)
+        self.buffer_size = buffer_size
+        self._dice: List[int] = []
+        self._dice_pos = 0
+        self._uniform: List[float] = []
+        self._uniform_pos = 0
+
+    def _refill_dice(self):
+        new = self.generator.integers(1, 7, size=self.buffer_size, dtype=np.int8)
+        self._dice = self._dice[self._dice_pos :] + new.tolist()
+        self._dice_pos = 0
+
+    def _refill_uniform(self):
+        self._uniform = self.generator.random(self.buffer_size).tolist()
+        self._uniform_pos = 0
+
+    def roll(self, n_dice: int) -> Tuple[int, ...]:
+        """Roll `n_dice` dice and return their values in sorted order"""
+        i = self._dice_pos
+        if i + n_dice > len(self._dice):
+            self._refill_dice()
+            i = 0
+        self._dice_pos = i + n_dice
+        return tuple(sorted(self._dice[i : i + n_dice]))
+
+    def random(self) -> float:
+        """A uniform float in [0, 1)"""
+        if self._uniform_pos == len(self._uniform):
+            self._refill_uniform()
+        u = self._uniform[self._uniform_pos]
+        self._uniform_pos += 1
+        return u
+
+    def choice(self, seq: Sequence):
+        """A uniformly chosen element of the non-empty sequence `seq`"""
+        return seq[int(self.random() * len(seq))]
+
+
+def make_rng(seed=None, rng: Optional[DiceRNG] = None) -> Optional[DiceRNG]:
+    """
+    The `DiceRNG` a game should use
+
+    An explicit `rng` wins; otherwise a new one is created from `seed`. With
+    neither, returns None, which means "use the global `random` module" (so
+    that `random.seed` keeps controlling the game).
+    """
+    if rng is not None:
+        return rng
+    if seed is not None:
+        return DiceRNG(seed)
+    return None
+
 
 class Dice(object):
     """
@@ -39,16 +259,19 @@ class Dice(object):
         Rolls the dice and gives a random integer
     """
 
+    __slots__ = ("value",)
+
+    unicode_dice = {
+        1: "\u2680",
+        2: "\u2681",
+        3: "\u2682",
+        4: "\u2683",
+        5: "\u2684",
+        6: "\u2685",
+    }
+
     def __init__(self, value: Optional[int] = None):
         self.value = value
-        self.unicode_dice = {
-            1: "\u2680",
-            2: "\u2681",
-            3: "\u2682",
-            4: "\u2683",
-            5: "\u2684",
-            6: "\u2685",
-        }
         if value is None:
             self.roll()
 
@@ -66,39 +289,91 @@ class Dice(object):
 
         return msg
 
-    def roll(self):
+    def roll(self, rng: Optional[DiceRNG] = None):
         """
         Rolls the dice and reset the current value
 
+        Parameters
+        ----------
+        rng: Optional[DiceRNG]
+            Where to draw the value from. Defaults to the `random` module
+
         Returns
         -------
         value : int
             The number rolled by the dice
         """
-        value = random.randint(1, 6)
+        value = random.randint(1, 6) if rng is None else rng.roll(1)[0]
         self.value = value
 
         return value
 
 
 class State:
+    """
+    The public state of a game of Farkle
+
+    States are immutable values: every transition (`roll`, `play_dice`,
+    `end_turn`, `step`) returns a new `State` that shares the unchanged
+    fields with its parent instead of copying them. The rolled dice are
+    stored as a sorted tuple of integers in `dice` and the scores as a
+    tuple with one entry per player.
+
+    Dice are rolled with `rng` (a `DiceRNG`), which is passed on to every
+    successor state. When `rng` is None the global `random` module is used.
+    """
+
+    __slots__ = (
+        "_n_players",
+        "current_round",
+        "scores",
+        "can_roll",
+        "dice",
+        "turn_sum",
+        "rng",
+    )
+
     # public game state
     current_round: int
-    scores: List[int]
+    scores: Tuple[int, ...]
     can_roll: int
-    rolled_dice: List[Dice]
+    dice: Tuple[int, ...]
     turn_sum: int
 
     # internal state
     _n_players: int
+    rng: Optional[DiceRNG]
 
-    def __init__(self, n_players):
+    def __init__(self, n_players, rng: Optional[DiceRNG] = None):
         self._n_players = n_players
         self.current_round = 0
-        self.scores = [0] * self._n_players
+        self.scores = (0,) * n_players
         self.can_roll = 6
-        self.rolled_dice = []
+        self.dice = ()
         self.turn_sum = 0
+        self.rng = rng
+
+    @classmethod
+    def _make(
+        cls,
+        n_players: int,
+        current_round: int,
+        scores: Tuple[int, ...],
+        can_roll: int,
+        dice: Tuple[int, ...],
+        turn_sum: int,
+        rng: Optional[DiceRNG] = None,
+    ) -> "State":
+        # fast constructor used by the transitions -- skips `__init__`
+        out = object.__new__(cls)
+        out._n_players = n_players
+        out.current_round = current_round
+        out.scores = scores
+        out.can_roll = can_roll
+        out.dice = dice
+        out.turn_sum = turn_sum
+        out.rng = rng
+        return out
 
     def __dir__(self):
         return [
@@ -109,30 +384,36 @@ class State:
             "turn_sum",
         ]
 
-    @property
-    def __dict__(self) -> dict:
-        return {k: getattr(self, k) for k in dir(self)}
-
-    @__dict__.setter
-    def __dict__(self, val: dict):
-        for (k, v) in val.items():
-            setattr(self, k, copy.deepcopy(v))
-
     def __repr__(self):
-        return f"Round: {self.current_round}. Score: {self.scores}"
+        return f"Round: {self.current_round}. Score: {list(self.scores)}"
 
     def __copy__(self) -> "State":
-        out = State(self._n_players)
-        out.__dict__ = self.__dict__
-        return out
-
-    def observable_state(self):
-        return (
+        # all fields are immutable, so a shallow copy is a full copy
+        return State._make(
+            self._n_players,
+            self.current_round,
+            self.scores,
             self.can_roll,
+            self.dice,
             self.turn_sum,
-            tuple(d.value for d in self.rolled_dice),
+            self.rng,
         )
 
+    def __deepcopy__(self, memo) -> "State":
+        return self.__copy__()
+
+    @property
+    def rolled_dice(self) -> List[Dice]:
+        """The rolled dice as a (freshly built) sorted list of `Dice`"""
+        return [Dice(v) for v in self.dice]
+
+    @rolled_dice.setter
+    def rolled_dice(self, val: List[Dice]):
+        self.dice = tuple(sorted(d.value for d in val))
+
+    def observable_state(self):
+        return (self.can_roll, self.turn_sum, self.dice)
+
     @property
     def current_player(self) -> int:
         return self.current_round % self._n_players
@@ -155,41 +436,65 @@ class State:
             A new instance of the state is returned recording updated score,
             refreshed dice, and reset current sum
         """
-
-        out = State(self._n_players)
-        out.current_round = self.current_round + 1
-        out.scores = copy.deepcopy(self.scores)
-
+        scores = self.scores
         if not forced:
-            out.scores[self.current_player] += self.turn_sum
-        return out
+            player = self.current_player
+            scores = (
+                scores[:player]
+                + (scores[player] + self.turn_sum,)
+                + scores[player + 1 :]
+            )
+
+        return State._make(
+            self._n_players, self.current_round + 1, scores, 6, (), 0, self.rng
+        )
 
     def roll(self) -> "State":
-        out = copy.copy(self)
-        out.rolled_dice = sorted([Dice() for _ in range(self.can_roll)])
-        out.can_roll = 0  # mark that only actions are to consider scores
-        return out
+        if self.rng is not None:
+            dice = self.rng.roll(self.can_roll)
+        else:
+            # NOTE: draw one `randint` per die (in order) so that a game seeded
+            #       with `random.seed` follows the same trajectory as one
+            #       rolling `Dice` objects
+            randint = random.randint
+            dice = tuple(sorted([randint(1, 6) for _ in range(self.can_roll)]))
+
+        # can_roll = 0 marks that only actions are to consider scores
+        return State._make(
+            self._n_players,
+            self.current_round,
+            self.scores,
+            0,
+            dice,
+            self.turn_sum,
+            self.rng,
+        )
 
     def play_dice(self, action: Action) -> "State":
         # TODO: validate that the chosen dice exist
-        out = copy.copy(self)
-
-        # add value to the current sum
-        out.turn_sum += action.value
-
-        n_played = len(action.used)
+        # Remove the played dice from `dice`
+        dice = self.dice
+        if action.used:
+            remaining = list(dice)
+            for k in action.used:
+                remaining.remove(k)
+            dice = tuple(remaining)
 
         # update number of dice that can be rolled
-        out.can_roll = len(self.rolled_dice) - n_played
-        if out.can_roll == 0:
+        can_roll = len(dice)
+        if can_roll == 0:
             # can pick them all up!
-            out.can_roll = 6
-
-        # Remove the played dice from `rolled_dice`
-        for k in action.used:
-            out.rolled_dice.remove(Dice(k))
-
-        return out
+            can_roll = 6
+
+        return State._make(
+            self._n_players,
+            self.current_round,
+            self.scores,
+            can_roll,
+            dice,
+            self.turn_sum + action.value,
+            self.rng,
+        )
 
     def enumerate_options(
         self, rolled_dice: Optional[List[Dice]] = None
@@ -202,67 +507,27 @@ class State:
         ----------
         rolled_dice: Optional[List[Dice]]
             A list of dice for which to enumerate options. If None are passed
-            then `self.rolled_dice` is used
+            then `self.dice` is used
 
         Returns
         -------
         opportunities : List[Action]
             A list of valid actions for a player
         """
-        rolled: List[Dice] = self.rolled_dice
-        if rolled_dice is not None:
-            rolled = rolled_dice
-
-        dice_counts = Counter([d.value for d in rolled])
-        opportunities: List[Action] = []
-
-        # Single dice opportunities
-        if dice_counts[1] > 0:
-            opportunities.append(Action((1,), "1", 100))
-
-        if dice_counts[5] > 0:
-            opportunities.append(Action((5,), "5", 50))
-
-        # Three pairs
-        pairs = []
-        pairs_playable = []
-        for i in range(1, 7):
-            if dice_counts[i] >= 2:
-                pairs.append(i)
-                pairs_playable.extend([i] * 2)
-        if len(pairs) == 3:
-            opportunities.append(Action(tuple(pairs_playable), f"Three pairs", 1500))
-
-        # Three of a kind
-        if dice_counts[1] >= 3:
-            opportunities.append(Action((1, 1, 1), "Three 1's", 1000))
-        for i in range(2, 7):
-            if dice_counts[i] >= 3:
-                opportunities.append(Action((i, i, i), f"Three {i}'s", i * 100))
-
-        for i in range(1, 7):
-            # Four of a kind
-            if dice_counts[i] >= 4:
-                opportunities.append(Action(tuple([i] * 4), f"Four {i}'s", 1000))
-
-            # Five of a kind
-            if dice_counts[i] >= 5:
-                opportunities.append(Action(tuple([i] * 5), f"Five {i}'s", 2000))
-
-            # Six of a kind
-            if dice_counts[i] == 6:
-                opportunities.append(Action(tuple([i] * 6), f"Six {i}'s", 3000))
-
-        # Straight
-        if all([dice_counts[i] > 0 for i in range(1, 7)]):
-            opportunities.append(Action(tuple(range(1, 7)), "1-2-3-4-5-6", 3000))
+        if rolled_dice is None:
+            return self._options(self.dice)
+        return self._options(tuple(sorted(d.value for d in rolled_dice)))
+
+    def _options(self, dice: Tuple[int, ...]) -> List[Action]:
+        # `enumerate_options` for a sorted tuple of dice values
+        opportunities = list(scoring_options(dice))
 
         # can_roll is zero iff I just rolled. If there are no opportunities, we
         # must be bankrupt for this round
         if len(opportunities) == 0 and self.can_roll == 0:
             # oops
             return [BANKRUPT]
-        
+
         if self.turn_sum > 0 and len(opportunities) == 0:
             opportunities.append(STOP)
 
@@ -300,10 +565,24 @@ class FarklePlayer(abc.ABC):
 
 
 class RandomFarklePlayer(FarklePlayer):
+    """
+    A player that picks uniformly at random among its choices
+
+    Choices are drawn from `rng` if given, otherwise from the `rng` of the
+    state being played (so a seeded game is fully reproducible), and
+    otherwise from the global `random` module.
+    """
+
     name = "random_robot"
 
+    def __init__(self, rng: Optional[DiceRNG] = None):
+        self.rng = rng
+
     def act(self, state: State, choices: List[Action]) -> Action:
-        return random.choice(choices)
+        rng = self.rng or state.rng
+        if rng is None:
+            return random.choice(choices)
+        return rng.choice(choices)
 
 
 class HumanFarklePlayer(FarklePlayer):
@@ -313,7 +592,7 @@ class HumanFarklePlayer(FarklePlayer):
     def act(self, state: State, choices: List[Action]) -> Action:
         # get an action from the user
         print(
-            f"(score: {state.scores}) You have rolled: ",
+            f"(score: {list(state.scores)}) You have rolled: ",
             state.rolled_dice,
             "(",
             [x.value for x in state.rolled_dice],
@@ -333,19 +612,226 @@ class HumanFarklePlayer(FarklePlayer):
                 print("Input not understood, try again!")
 
 
+class NoHistory:
+    """A history that records nothing"""
+
+    def append(self, item: Tuple[State, Action]):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def __iter__(self) -> Iterator[Tuple[State, Action]]:
+        return iter(())
+
+
+class ColumnarHistory:
+    """
+    A compact log of `(State, Action)` pairs stored as NumPy columns
+
+    Each transition takes a few dozen bytes instead of a pair of Python
+    objects. Entries are rebuilt as `State` objects on iteration, and
+    the whole log can be written to (and read from) a `.npz` file.
+
+    Columns
+    -------
+    current_round, can_roll, turn_sum, action: np.ndarray
+        One entry per transition. `action` is the index of the action in
+        `action_space()` (-1 for the start of a turn in `Farkle.play`)
+    dice: np.ndarray
+        The dice packed with `pack_dice`
+    scores: np.ndarray
+        `(n, n_players)` scores
+    """
+
+    _columns = ("current_round", "can_roll", "dice", "turn_sum", "action")
+
+    def __init__(self, n_players: int, capacity: int = 1024):
+        self.n_players = n_players
+        self._n = 0
+        self._data = {
+            "current_round": np.empty(capacity, dtype=np.int32),
+            "can_roll": np.empty(capacity, dtype=np.int8),
+            "dice": np.empty(capacity, dtype=np.int32),
+            "turn_sum": np.empty(capacity, dtype=np.int32),
+            "action": np.empty(capacity, dtype=np.int16),
+            "scores": np.empty((capacity, n_players), dtype=np.int32),
+        }
+        self._action_ids = {a: i for i, a in enumerate(action_space())}
+
+    def __len__(self):
+        return self._n
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in self._columns or name == "scores":
+            return self._data[name][: self._n]
+        raise AttributeError(name)
+
+    def append(self, item: Tuple[State, Action]):
+        state, action = item
+        i = self._n
+        if i == len(self._data["action"]):
+            for k, v in self._data.items():
+                self._data[k] = np.concatenate([v, np.empty_like(v)])
+
+        data = self._data
+        data["current_round"][i] = state.current_round
+        data["can_roll"][i] = state.can_roll
+        data["dice"][i] = pack_dice(state.dice)
+        data["turn_sum"][i] = state.turn_sum
+        data["scores"][i] = state.scores
+        data["action"][i] = -1 if action is _START_TURN else self._action_ids[action]
+        self._n = i + 1
+
+    def __iter__(self) -> Iterator[Tuple[State, Action]]:
+        actions = action_space()
+        columns = [getattr(self, c).tolist() for c in self._columns]
+        scores = self.scores.tolist()
+        for (rnd, can_roll, dice, turn_sum, a), score in zip(zip(*columns), scores):
+            state = State._make(
+                self.n_players, rnd, tuple(score), can_roll, unpack_dice(dice), turn_sum
+            )
+            yield state, _START_TURN if a == -1 else actions[a]
+
+    def save(self, path: str):
+        """Write the log to a `.npz` file"""
+        np.savez(
+            path,
+            n_players=self.n_players,
+            **{k: getattr(self, k) for k in self._data},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ColumnarHistory":
+        """Read a log written by `save`"""
+        with np.load(path) as f:
+            out = cls(int(f["n_players"]), capacity=max(len(f["action"]), 1))
+            for k in out._data:
+                out._data[k][: len(f[k])] = f[k]
+            out._n = len(f["action"])
+        return out
+
+
+History = Union[List, deque, NoHistory, ColumnarHistory]
+
+
+def make_history(mode: str, n_players: int, size: int = 1000) -> History:
+    """
+    Create the container a game uses to record its `(State, Action)` pairs
+
+    Parameters
+    ----------
+    mode: str
+        One of
+
+        - "full": keep every transition in a list
+        - "off": keep nothing
+        - "ring": keep only the last `size` transitions
+        - "columnar": keep every transition in a compact `ColumnarHistory`
+    n_players: int
+        The number of players in the game
+    size: int, default=1000
+        The number of transitions kept with `mode="ring"`
+    """
+    if mode == "full":
+        return []
+    if mode == "off":
+        return NoHistory()
+    if mode == "ring":
+        return deque(maxlen=size)
+    if mode == "columnar":
+        return ColumnarHistory(n_players)
+    raise ValueError(f"Unknown history mode {mode!r}")
+
+
+TurnEngine = Generator[Tuple[State, List[Action]], Action, State]
+
+
+def play_turn(state: State, choices: Optional[List[Action]] = None) -> TurnEngine:
+    """
+    Step through the current player's turn, one action at a time
+
+    This is a generator: it yields `(state, choices)` each time the player
+    must act and expects the chosen action back through `send`. When the
+    turn is over it returns the first state of the next player's turn
+    (available as `StopIteration.value`, or as the result of `yield from`).
+
+    Parameters
+    ----------
+    state: State
+        The state the turn starts from
+    choices: Optional[List[Action]]
+        The options in `state`, if they are already known
+
+    Examples
+    --------
+    >>> turn = play_turn(state)
+    >>> s, choices = next(turn)
+    >>> s, choices = turn.send(choices[0])
+    """
+    player = state.current_player
+    if choices is None:
+        choices = state.enumerate_options()
+    while True:
+        action = yield state, choices
+        state = state.step(action)
+
+        # check if player chose to stop (or went bankrupt)
+        if state.current_player != player:
+            return state
+        choices = state.enumerate_options()
+
+
+def drive_turn(
+    turn: TurnEngine,
+    player: FarklePlayer,
+    on_step: Optional[Callable[[Action, State], None]] = None,
+) -> State:
+    """
+    Let `player` choose every action of a turn started with `play_turn`
+
+    `on_step(action, new_state)` is called after each action. Returns the
+    state after the turn is over.
+    """
+    state, choices = next(turn)
+    while True:
+        action = player.act(state, choices)
+        try:
+            state, choices = turn.send(action)
+        except StopIteration as stop:
+            if on_step is not None:
+                on_step(action, stop.value)
+            return stop.value
+        if on_step is not None:
+            on_step(action, state)
+
+
 class Farkle(object):
     """
     The Farkle game is executed from this class
     """
 
-    def __init__(self, players, points_to_win=10_000, verbose: bool = False):
+    def __init__(
+        self,
+        players,
+        points_to_win=10_000,
+        verbose: bool = False,
+        history: str = "full",
+        history_size: int = 1000,
+        seed=None,
+        rng: Optional[DiceRNG] = None,
+    ):
         self.points_to_win = points_to_win
         self.players = players
         self._have_human = any(map(lambda x: isinstance(x, HumanFarklePlayer), players))
         self.verbose = verbose or self._have_human
         self.n_players = len(players)
-        self._state = State(self.n_players)
-        self._history: List[Tuple[State, Action]] = []
+        self.rng = make_rng(seed, rng)
+        self._state = State(self.n_players, self.rng)
+        self.n_steps = 0
+        self.history_mode = history
+        self.history_size = history_size
+        self._history = make_history(history, self.n_players, history_size)
 
     @property
     def state(self) -> State:
@@ -354,10 +840,14 @@ class Farkle(object):
     def set_state(self, action: Action, new_state: State):
         self._history.append((self.state, action))
         self._state = new_state
+        self.n_steps += 1
 
     def reset(self):
-        self._state = State(self.n_players)
-        self._history = []
+        self._state = State(self.n_players, self.rng)
+        self.n_steps = 0
+        self._history = make_history(
+            self.history_mode, self.n_players, self.history_size
+        )
 
     def step(self, action: Action) -> State:
         new_state = self.state.step(action)
@@ -369,30 +859,9 @@ class Farkle(object):
         Lets each player play a turn and then prints the updated
         scores at the end of the turn
         """
-        current_player_num = self.state.current_player
-        current_player = self.players[current_player_num]
-
-        if choices is None:
-            choices = self.state.enumerate_options()
-        if len(choices) == 0:
-            # bankrupt... bummer
-            self.step(BANKRUPT)
-            return
-        action = current_player.act(self.state, choices)
-        self.step(action)
-
-        # check if player chose to stop
-        if current_player_num != self.state.current_player:
-            return
-
-        # check if player has no actions
-        next_choices = self.state.enumerate_options()
-        if len(next_choices) == 0:
-            self.step(BANKRUPT)
-            return
-
-        # otherwise, let the player continue the turn
-        self.player_turn(next_choices)
+        current_player = self.players[self.state.current_player]
+        turn = play_turn(self.state, choices)
+        drive_turn(turn, current_player, on_step=self.set_state)
 
         return None
 
@@ -426,7 +895,7 @@ class Farkle(object):
                 if self.verbose:
                     current_player = self.players[self.state.current_player]
                     print(f"It is {current_player}'s turn")
-                self.step(Action({}, "roll", 0))
+                self.step(_START_TURN)
                 self.player_turn()
 
 
@@ -437,42 +906,43 @@ class FarkleEnv:
         opponent: FarklePlayer = RandomFarklePlayer(),
         points_to_win=10_000,
         track_history: bool = False,
+        history: Optional[str] = None,
+        history_size: int = 1000,
+        seed=None,
+        rng: Optional[DiceRNG] = None,
     ):
         self.points_to_win = points_to_win
         self.opponent = opponent
         self.n_players = 2
-        self._state = State(self.n_players)
-        self._history: List[Tuple[State,Action]] = []
+        self.rng = make_rng(seed, rng)
+        self._state = State(self.n_players, self.rng)
         self.track_history = track_history
-    
+        if history is None:
+            history = "full" if track_history else "off"
+        self.history_mode = history
+        self.history_size = history_size
+        self._history = make_history(history, self.n_players, history_size)
+
     @property
     def state(self) -> State:
         return self._state
 
     def set_state(self, action: Action, new_state: State):
         self._state = new_state
-        if self.track_history:
-            self._history.append((self.state, action))
+        self._history.append((self.state, action))
 
     def opponent_turn(self, s: State) -> State:
-        choices = s.enumerate_options()
-        action = self.opponent.act(s, choices)
-        sp = s.step(action)
-
-        # check if player chose to stop
-        if sp.current_player != 1:
-            return sp
-
-        # Player didn't stop, but still their turn. Call again
-        return self.opponent_turn(sp)
+        return drive_turn(play_turn(s), self.opponent)
 
     # key methods needed
     def done(self, state) -> bool:
         return any(score > self.points_to_win for score in state.scores)
 
     def reset(self):
-        self._history = []
-        self._state = State(self.n_players)
+        self._history = make_history(
+            self.history_mode, self.n_players, self.history_size
+        )
+        self._state = State(self.n_players, self.rng)
         return self.state.roll()
 
     def step(self, s: State, a: Action) -> Tuple[State, int]:
@@ -492,7 +962,162 @@ class FarkleEnv:
         return sp, r
 
     def enumerate_options(self, s: State) -> List[Action]:
-        return self.state.enumerate_options(s.rolled_dice)
+        return self.state._options(s.dice)
+
+
+class QTable:
+    """
+    A tabular action-value function Q(s, a) for Farkle stored in a NumPy array
+
+    States are interned by `State.observable_state()` and actions by their
+    position in `action_space()`, so `Q(s, a)` is `values[state_id, action_id]`.
+    The rows of `values` grow by doubling as new states are seen.
+
+    It can be used in place of a `defaultdict`-based table:
+    `Q(s, a)`, `Q[(s, a)] = v` and `Q.get_greedy(s, A_s)`.
+
+    Parameters
+    ----------
+    default_value: float, default=0.0
+        The value of state-action pairs that have not been set
+    capacity: int, default=1024
+        The number of states to allocate room for up front
+    dtype: default=np.float64
+        The dtype of `values`. `np.float32` halves the memory of large tables
+    """
+
+    def __init__(
+        self,
+        default_value: float = 0.0,
+        capacity: int = 1024,
+        dtype=np.float64,
+    ):
+        self.default_value = default_value
+        self.actions = action_space()
+        self._action_ids = {a: i for i, a in enumerate(self.actions)}
+        self._state_ids: Dict[Tuple, int] = {}
+        self.values = np.full((capacity, len(self.actions)), default_value, dtype)
+
+    def __len__(self):
+        """The number of states seen so far"""
+        return len(self._state_ids)
+
+    def state_id(self, s: State) -> int:
+        """The row of `values` for `s`, adding a new row if needed"""
+        key = s.observable_state()
+        i = self._state_ids.get(key)
+        if i is None:
+            i = len(self._state_ids)
+            if i == len(self.values):
+                # double the rows (at least one, for an empty table)
+                extra = np.full(
+                    (max(i, 1), len(self.actions)),
+                    self.default_value,
+                    self.values.dtype,
+                )
+                self.values = np.concatenate([self.values, extra])
+            self._state_ids[key] = i
+        return i
+
+    def action_id(self, a: Action) -> int:
+        return self._action_ids[a]
+
+    def __call__(self, s: State, a: Action) -> float:
+        i = self._state_ids.get(s.observable_state())
+        if i is None:
+            return self.default_value
+        return self.values[i, self._action_ids[a]].item()
+
+    def __setitem__(self, k: Tuple[State, Action], v: float):
+        s, a = k
+        i = self.state_id(s)  # may grow (and replace) `values`
+        self.values[i, self._action_ids[a]] = v
+
+    def get_greedy(self, s: State, A_s: List[Action]) -> Action:
+        """The action in `A_s` with the highest value, ties broken at random"""
+        i = self._state_ids.get(s.observable_state())
+        if i is None:
+            # every action still has the default value
+            return random.choice(A_s)
+
+        # NOTE: `A_s` rarely has more than a handful of actions, so one
+        #       conversion of the row beats several small NumPy calls
+        row = self.values[i].tolist()
+        ids = self._action_ids
+        vals = [row[ids[a]] for a in A_s]
+        max_val = max(vals)
+        return random.choice([a for (a, v) in zip(A_s, vals) if v == max_val])
+
+    def greedy_action_ids(
+        self, state_ids: np.ndarray, mask: np.ndarray
+    ) -> np.ndarray:
+        """
+        Vectorized greedy choice for many states at once
+
+        Parameters
+        ----------
+        state_ids: np.ndarray
+            Rows of `values` (see `state_id`)
+        mask: np.ndarray
+            `(len(state_ids), len(action_space()))` boolean array of legal
+            actions, e.g. `LegalActions.mask` from `farkle_batch`
+
+        Returns
+        -------
+        ids: np.ndarray
+            The id of the legal action with the highest value in each state.
+            Ties go to the lowest id
+        """
+        vals = np.where(mask, self.values[state_ids], -np.inf)
+        return vals.argmax(axis=1)
+
+    def save(self, path: str):
+        """
+        Save the table to `{path}.npy` (values) and `{path}.index.npz` (states)
+
+        The values are stored as a plain `.npy` file so that `load` can
+        memory-map them. Both files are written under temporary names and
+        then renamed into place, so saving over the files a table was loaded
+        (and memory-mapped) from is safe, and a failed save leaves the old
+        files intact.
+        """
+        n = len(self)
+        keys = list(self._state_ids)
+        with open(f"{path}.npy.tmp", "wb") as f:
+            np.save(f, self.values[:n])
+        with open(f"{path}.index.npz.tmp", "wb") as f:
+            np.savez(
+                f,
+                can_roll=np.array([k[0] for k in keys], dtype=np.int8),
+                turn_sum=np.array([k[1] for k in keys], dtype=np.int64),
+                dice=np.array([pack_dice(k[2]) for k in keys], dtype=np.int32),
+                default_value=self.default_value,
+            )
+        # a mapping of the old `.npy` keeps its (now unlinked) file alive
+        os.replace(f"{path}.npy.tmp", f"{path}.npy")
+        os.replace(f"{path}.index.npz.tmp", f"{path}.index.npz")
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "c") -> "QTable":
+        """
+        Load a table written by `save`
+
+        With the default `mmap_mode="c"` the values are memory-mapped
+        copy-on-write: nothing is read until it is used, and updates stay in
+        memory without touching the file until the table is saved again
+        (which may be to the same `path`). Pass `mmap_mode=None` to read the
+        values into memory.
+        """
+        with np.load(f"{path}.index.npz") as index:
+            out = cls(float(index["default_value"]), capacity=1)
+            keys = zip(
+                index["can_roll"].tolist(),
+                index["turn_sum"].tolist(),
+                map(unpack_dice, index["dice"].tolist()),
+            )
+            out._state_ids = {k: i for i, k in enumerate(keys)}
+        out.values = np.load(f"{path}.npy", mmap_mode=mmap_mode)
+        return out
 
 
 def play_game(algo):
@@ -509,7 +1134,9 @@ def play_many_games(algo, N):
         play_game(algo)
         terminal_states.append(algo.s)
         if i % print_skip == 0:
-            print(f"Done with {i}/{N} (len(Q) = {len(algo.Q.Q)})")
+            # `QTable` has a length; a dict-based table keeps its dict in `Q`
+            Q = getattr(algo.Q, "Q", algo.Q)
+            print(f"Done with {i}/{N} (len(Q) = {len(Q)})")
     return terminal_states
 
 
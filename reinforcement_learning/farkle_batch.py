@@ -0,0 +1,363 @@
+"""
+Play many games of Farkle at once using NumPy arrays
+
+`BatchFarkleEnv` holds the state of N games as arrays and advances all of
+them in lock step. Actions are integer ids into `farkle.action_space()`,
+and the legal actions for a set of games come back as a `LegalActions`
+object (a boolean mask, or the n-th legal id of each game), so policies
+can be written as vectorized functions instead of per-game Python calls.
+
+The rules (including when STOP is offered and when the game is over) are
+the same as in `farkle.State` and `farkle.Farkle`.
+"""
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from farkle import (
+    Action,
+    FarklePlayer,
+    State,
+    _build_scoring_table,
+    action_space,
+    pack_dice,
+)
+
+ACTIONS = action_space()
+N_ACTIONS = len(ACTIONS)
+BANKRUPT_ID, ROLL_ID, STOP_ID = 0, 1, 2
+ACTION_IDS = {a: i for i, a in enumerate(ACTIONS)}
+
+# The dice of a game are stored as a single integer (see `farkle.pack_dice`):
+# the number of dice showing face k is digit k-1 of its base-7 representation.
+_PACK = 7 ** np.arange(6, dtype=np.int64)
+_N_PACKED = 7**6
+
+# `_COUNTS[p]` is the vector of face counts and `_N_DICE[p]` the number of
+# dice for the packed value `p`
+_COUNTS = (np.arange(_N_PACKED)[:, None] // _PACK % 7).astype(np.int8)
+_N_DICE = _COUNTS.sum(axis=1, dtype=np.int8)
+
+# packed dice used by each action, and the points it scores
+_USED = np.array([pack_dice(a.used) for a in ACTIONS], dtype=np.int64)
+_VALUE = np.array([a.value for a in ACTIONS], dtype=np.int64)
+
+# The legal actions only depend on the dice, on `can_roll > 0` and on
+# `turn_sum > 0`. `_SIGNATURE` maps packed dice to 4 times the row of those
+# dice in the scoring table. The "option key"
+# `4 * row + 2 * (can_roll > 0) + (turn_sum > 0)` then indexes precomputed
+# masks and lists of legal action ids.
+
+
+def _build_option_tables():
+    table = _build_scoring_table()
+    signature = np.full(_N_PACKED, -1, dtype=np.int64)
+    key_mask = np.zeros((4 * len(table), N_ACTIONS), dtype=bool)
+    for row, (dice, options) in enumerate(table.items()):
+        signature[pack_dice(dice)] = 4 * row
+        for flags in range(4):
+            can_roll, turn_sum = flags & 2, flags & 1
+            mask = key_mask[4 * row + flags]
+            for a in options:
+                mask[ACTION_IDS[a]] = True
+
+            # same adjustments as `State.enumerate_options`
+            if not options and not can_roll:
+                mask[BANKRUPT_ID] = True
+            if not options and can_roll and turn_sum:
+                mask[STOP_ID] = True
+            if can_roll:
+                mask[ROLL_ID] = True
+
+    key_count = key_mask.sum(axis=1)
+    key_ids = np.zeros((len(key_mask), key_count.max()), dtype=np.int64)
+    for key, mask in enumerate(key_mask):
+        ids = np.flatnonzero(mask)
+        key_ids[key, : len(ids)] = ids
+    return signature, key_mask, key_count, key_ids
+
+
+_SIGNATURE, _KEY_MASK, _KEY_COUNT, _KEY_IDS = _build_option_tables()
+
+
+class LegalActions:
+    """
+    The legal actions in a set of games
+
+    Stored as one integer "option key" per game, so that building it and
+    drawing from it cost O(n_games) rather than O(n_games * N_ACTIONS).
+    """
+
+    __slots__ = ("keys",)
+
+    def __init__(self, keys: np.ndarray):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, sel) -> "LegalActions":
+        return LegalActions(self.keys[sel])
+
+    @property
+    def mask(self) -> np.ndarray:
+        """`(n, N_ACTIONS)` boolean array marking the legal actions"""
+        return _KEY_MASK[self.keys]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of legal actions in each game"""
+        return _KEY_COUNT[self.keys]
+
+    def nth(self, k: np.ndarray) -> np.ndarray:
+        """The id of the `k[i]`-th legal action (in id order) of game `i`"""
+        return _KEY_IDS[self.keys, k]
+
+    def contains(self, actions: np.ndarray) -> np.ndarray:
+        """Boolean array: is `actions[i]` legal in game `i`?"""
+        return _KEY_MASK[self.keys, actions]
+
+
+Policy = Callable[["BatchFarkleEnv", np.ndarray, LegalActions], np.ndarray]
+
+
+class BatchFarkleEnv:
+    """
+    N independent games of Farkle stored as NumPy arrays
+
+    Parameters
+    ----------
+    n_games: int
+        The number of games to simulate
+    n_players: int, default=2
+        The number of players in each game
+    points_to_win: int, default=10_000
+        A game ends at the end of a round in which some player has at least
+        this many points (as in `Farkle.play`)
+    seed: Optional[int]
+        Seed for the `numpy.random.Generator` used to roll the dice
+
+    Attributes
+    ----------
+    dice: np.ndarray
+        `(n_games,)` rolled dice, packed into one base-7 integer per game.
+        See `counts` for the unpacked form
+    can_roll, turn_sum, current_round: np.ndarray
+        `(n_games,)` arrays with the fields of the same name in `State`
+    scores: np.ndarray
+        `(n_games, n_players)` scores
+    done: np.ndarray
+        `(n_games,)` boolean marking finished games
+    """
+
+    def __init__(
+        self,
+        n_games: int,
+        n_players: int = 2,
+        points_to_win: int = 10_000,
+        seed: Optional[int] = None,
+    ):
+        self.n_games = n_games
+        self.n_players = n_players
+        self.points_to_win = points_to_win
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        n = self.n_games
+        self.dice = np.zeros(n, dtype=np.int64)
+        self.can_roll = np.full(n, 6, dtype=np.int8)
+        self.turn_sum = np.zeros(n, dtype=np.int64)
+        self.scores = np.zeros((n, self.n_players), dtype=np.int64)
+        self.current_round = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """`(n_games, 6)` number of rolled dice showing each face"""
+        return _COUNTS[self.dice]
+
+    @property
+    def current_player(self) -> np.ndarray:
+        return self.current_round % self.n_players
+
+    def active(self) -> np.ndarray:
+        """Indices of the games that are not finished"""
+        return np.flatnonzero(~self.done)
+
+    def state(self, game: int) -> State:
+        """Build a `farkle.State` for one game"""
+        counts = _COUNTS[self.dice[game]]
+        dice = tuple(np.repeat(np.arange(1, 7), counts).tolist())
+        return State._make(
+            self.n_players,
+            int(self.current_round[game]),
+            tuple(self.scores[game].tolist()),
+            int(self.can_roll[game]),
+            dice,
+            int(self.turn_sum[game]),
+        )
+
+    def legal_actions(self, rows: Optional[np.ndarray] = None) -> LegalActions:
+        """
+        Compute the legal actions for a set of games
+
+        Parameters
+        ----------
+        rows: Optional[np.ndarray]
+            Indices of the games to consider. Defaults to all active games
+
+        Returns
+        -------
+        legal: LegalActions
+            The legal actions of game `rows[i]` are in entry `i`. Use
+            `legal.mask` for a `(len(rows), N_ACTIONS)` boolean array
+        """
+        if rows is None:
+            rows = self.active()
+        keys = _SIGNATURE[self.dice[rows]]
+        keys += 2 * (self.can_roll[rows] > 0)
+        keys += self.turn_sum[rows] > 0
+        return LegalActions(keys)
+
+    def step(
+        self,
+        actions: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+        legal: Optional[LegalActions] = None,
+    ):
+        """
+        Apply one action in each of a set of games
+
+        Parameters
+        ----------
+        actions: np.ndarray
+            Integer action ids, one per game in `rows`
+        rows: Optional[np.ndarray]
+            Indices of the games to step. Defaults to all active games
+        legal: Optional[LegalActions]
+            The output of `legal_actions(rows)`, if it is already available
+        """
+        if rows is None:
+            rows = self.active()
+        if legal is None:
+            legal = self.legal_actions(rows)
+        actions = np.asarray(actions)
+        ok = legal.contains(actions)
+        if not ok.all():
+            bad = rows[~ok][0]
+            raise ValueError(f"Illegal action chosen for game {bad}")
+
+        # play dice
+        play = actions > STOP_ID
+        if play.any():
+            r, a = rows[play], actions[play]
+            self.dice[r] -= _USED[a]
+            self.turn_sum[r] += _VALUE[a]
+            remaining = _N_DICE[self.dice[r]]
+            self.can_roll[r] = np.where(remaining == 0, 6, remaining)
+
+        # roll
+        roll = rows[actions == ROLL_ID]
+        if len(roll):
+            self._roll(roll)
+
+        # end of turn
+        stop = rows[actions == STOP_ID]
+        self.scores[stop, self.current_player[stop]] += self.turn_sum[stop]
+        ended = rows[(actions == STOP_ID) | (actions == BANKRUPT_ID)]
+        if len(ended):
+            self._end_turn(ended)
+
+    def _roll(self, rows: np.ndarray):
+        n_dice = self.can_roll[rows]
+        faces = self.rng.integers(0, 6, size=(6, len(rows)), dtype=np.int8)
+        dice = np.zeros(len(rows), dtype=np.int64)
+        for j in range(6):
+            dice += np.where(j < n_dice, _PACK[faces[j]], 0)
+        self.dice[rows] = dice
+        self.can_roll[rows] = 0
+
+    def _end_turn(self, rows: np.ndarray):
+        self.dice[rows] = 0
+        self.can_roll[rows] = 6
+        self.turn_sum[rows] = 0
+        self.current_round[rows] += 1
+
+        # like `Farkle.play`, only check for a winner once every player
+        # has had the same number of turns
+        new_round = rows[self.current_round[rows] % self.n_players == 0]
+        over = (self.scores[new_round] >= self.points_to_win).any(axis=1)
+        self.done[new_round[over]] = True
+
+    def winners(self) -> np.ndarray:
+        """`(n_games, n_players)` boolean array of who reached `points_to_win`"""
+        return self.scores >= self.points_to_win
+
+    def play(self, policies: Sequence[Policy], max_steps: Optional[int] = None):
+        """
+        Play every active game to the end
+
+        Parameters
+        ----------
+        policies: Sequence[Policy]
+            One policy per player. A policy is called as
+            `policy(env, rows, legal)` and must return one action id for
+            each game in `rows`, chosen among those allowed by `legal`
+        max_steps: Optional[int]
+            Stop after this many batched steps even if games are unfinished
+
+        Returns
+        -------
+        winners: np.ndarray
+            See `winners`
+        """
+        if len(policies) != self.n_players:
+            raise ValueError(f"Need {self.n_players} policies, got {len(policies)}")
+
+        n_steps = 0
+        rows = self.active()
+        while len(rows) and (max_steps is None or n_steps < max_steps):
+            legal = self.legal_actions(rows)
+            player = self.current_player[rows]
+            actions = np.empty(len(rows), dtype=np.int64)
+            for p, policy in enumerate(policies):
+                sel = player == p
+                if sel.any():
+                    actions[sel] = policy(self, rows[sel], legal[sel])
+            self.step(actions, rows, legal)
+            n_steps += 1
+            rows = self.active()
+
+        return self.winners()
+
+
+def random_policy(seed: Optional[int] = None) -> Policy:
+    """A policy that picks uniformly among the legal actions of each game"""
+    rng = np.random.default_rng(seed)
+
+    def policy(env: BatchFarkleEnv, rows: np.ndarray, legal: LegalActions):
+        k = (rng.random(len(rows)) * legal.counts).astype(np.int64)
+        return legal.nth(k)
+
+    return policy
+
+
+def player_policy(player: FarklePlayer) -> Policy:
+    """
+    Wrap a `FarklePlayer` so that it can play in a `BatchFarkleEnv`
+
+    The player's `act` method is called once per game, so this is only as
+    fast as the player itself. It is meant for comparing hand-written or
+    tabular players against vectorized policies.
+    """
+
+    def policy(env: BatchFarkleEnv, rows: np.ndarray, legal: LegalActions):
+        out = np.empty(len(rows), dtype=np.int64)
+        for i, g in enumerate(rows):
+            s = env.state(g)
+            choices: List[Action] = s.enumerate_options()
+            out[i] = ACTION_IDS[player.act(s, choices)]
+        return out
+
+    return policy
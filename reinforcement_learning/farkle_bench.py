@@ -0,0 +1,329 @@
+"""
+Throughput benchmarks for `farkle.py`
+
+Run as a script to time the main code paths and write the results as JSON:
+
+    python farkle_bench.py --out bench.json
+    python farkle_bench.py --out new.json --compare bench.json
+
+With `--compare` every rate is checked against the earlier run and the
+script exits with status 1 if any of them dropped by more than
+`--tolerance` (default 10%).
+
+Benchmarks
+----------
+state_step
+    Transitions per second through `State.step`, replaying the
+    (state, action) pairs of recorded random games
+enumerate_options
+    `State.enumerate_options` calls per second on the same states, next to
+    the untabled `_compute_scoring_options` for reference
+farkle_play
+    Random-vs-random games per second through `Farkle.play`
+env_qlearning
+    `FarkleEnv` episodes per second with the Q-learning loop of
+    `rl.03_qlearning.ipynb`, learning into a `QTable`
+alloc_per_transition
+    Memory blocks and bytes left allocated by each `State.step`, measured
+    with `tracemalloc` while the new states are kept alive (as they are
+    when a game records its history)
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from farkle import (
+    Action,
+    Farkle,
+    FarkleEnv,
+    QTable,
+    RandomFarklePlayer,
+    State,
+    _compute_scoring_options,
+    play_game,
+)
+
+Result = Dict[str, Any]
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> float:
+    # the minimum is the least noisy estimate of the cost of `fn`
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def _rate(name: str, n: int, seconds: float, unit: str, **extra) -> Result:
+    out = {"name": name, "n": n, "seconds": seconds, "rate": n / seconds}
+    out.update(unit=unit, **extra)
+    return out
+
+
+def record_transitions(n_games: int, seed: int = 0) -> List[Tuple[State, Action]]:
+    """The (state, action) pairs of `n_games` seeded random games"""
+    random.seed(seed)
+    out = []
+    for _ in range(n_games):
+        f = Farkle([RandomFarklePlayer(), RandomFarklePlayer()])
+        f.play()
+        out.extend(f._history)
+    return out
+
+
+def bench_state_step(pairs: List[Tuple[State, Action]], repeat: int = 5) -> Result:
+    def run():
+        for s, a in pairs:
+            s.step(a)
+
+    random.seed(0)
+    return _rate("state_step", len(pairs), _best_time(run, repeat), "transitions/s")
+
+
+def bench_enumerate_options(
+    pairs: List[Tuple[State, Action]], repeat: int = 5
+) -> Result:
+    states = [s for s, _ in pairs]
+
+    def run():
+        for s in states:
+            s.enumerate_options()
+
+    def run_untabled():
+        for s in states:
+            _compute_scoring_options(s.dice)
+
+    t = _best_time(run, repeat)
+    t_untabled = _best_time(run_untabled, repeat)
+    return _rate(
+        "enumerate_options",
+        len(states),
+        t,
+        "calls/s",
+        untabled_rate=len(states) / t_untabled,
+    )
+
+
+def bench_farkle_play(
+    n_games: int, history: str = "full", seed: int = 0, repeat: int = 3
+) -> Result:
+    def run():
+        random.seed(seed)
+        for _ in range(n_games):
+            p = [RandomFarklePlayer(), RandomFarklePlayer()]
+            Farkle(p, history=history).play()
+
+    t = _best_time(run, repeat)
+    return _rate("farkle_play", n_games, t, "games/s", history=history)
+
+
+class QLearner:
+    """
+    The `Qlearning` class of `rl.03_qlearning.ipynb`, learning into a `QTable`
+
+    Kept here so the benchmark measures the same loop the notebook runs.
+    """
+
+    def __init__(self, env: FarkleEnv, epsilon=0.9, alpha=0.1, beta=1.0):
+        self.env = env
+        self.Q = QTable()
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self.beta = beta
+        self.restart_episode()
+
+    def restart_episode(self):
+        self.s = self.env.reset()
+
+    def generate_A(self, s: State, A_s: List[Action]) -> Action:
+        if random.random() > self.epsilon:
+            return random.choice(A_s)
+        return self.Q.get_greedy(s, A_s)
+
+    def done(self, s: Optional[State] = None) -> bool:
+        return self.env.done(s if s else self.s)
+
+    def step(self):
+        s = self.s
+        A_s = self.env.enumerate_options(s)
+        a = self.generate_A(s, A_s)
+        sp, r = self.env.step(s, a)
+        if self.done(sp):
+            self.s = sp
+            return
+
+        ap = self.Q.get_greedy(sp, self.env.enumerate_options(sp))
+        Q, α, β = self.Q, self.alpha, self.beta
+        Q[(s, a)] = Q(s, a) + α * (r + β * Q(sp, ap) - Q(s, a))
+        self.s = sp
+
+
+def bench_env_qlearning(n_episodes: int, seed: int = 0, repeat: int = 3) -> Result:
+    def run():
+        random.seed(seed)
+        algo = QLearner(FarkleEnv())
+        for _ in range(n_episodes):
+            play_game(algo)
+
+    t = _best_time(run, repeat)
+    return _rate("env_qlearning", n_episodes, t, "episodes/s")
+
+
+def bench_alloc_per_transition(pairs: List[Tuple[State, Action]]) -> Result:
+    random.seed(0)
+    kept: List[Optional[State]] = [None] * len(pairs)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i, (s, a) in enumerate(pairs):
+        kept[i] = s.step(a)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    blocks = sum(d.count_diff for d in diff)
+    size = sum(d.size_diff for d in diff)
+    n = len(pairs)
+    return {
+        "name": "alloc_per_transition",
+        "n": n,
+        "blocks": blocks / n,
+        "bytes": size / n,
+        "unit": "per transition",
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run_all(scale: float = 1.0, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run every benchmark
+
+    Parameters
+    ----------
+    scale: float, default=1.0
+        Multiplies the amount of work in each benchmark. Use a small value
+        (e.g. 0.1) for a quick smoke run
+    seed: int, default=0
+        Seed for the recorded games and the `random` module
+
+    Returns
+    -------
+    report: Dict[str, Any]
+        `{"meta": {...}, "results": {name: result}}`, ready for `json.dump`
+    """
+    n = max(1, int(50 * scale))
+    pairs = record_transitions(n, seed)
+    results = [
+        bench_state_step(pairs),
+        bench_enumerate_options(pairs),
+        bench_farkle_play(n, "full", seed),
+        bench_farkle_play(n, "off", seed),
+        bench_env_qlearning(n, seed),
+        bench_alloc_per_transition(pairs),
+    ]
+    # the two `farkle_play` runs differ by history mode
+    named = {}
+    for r in results:
+        key = r["name"] if "history" not in r else f"{r['name']}[{r['history']}]"
+        named[key] = r
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "scale": scale,
+            "seed": seed,
+        },
+        "results": named,
+    }
+
+
+def compare(
+    old: Dict[str, Any], new: Dict[str, Any], tolerance: float = 0.1
+) -> List[str]:
+    """
+    Compare two reports from `run_all`
+
+    Returns
+    -------
+    regressions: List[str]
+        The names of the benchmarks whose rate dropped by more than
+        `tolerance` (a fraction), or whose allocations grew by more than it
+    """
+    regressions = []
+    print(f"{'benchmark':<28}{'old':>14}{'new':>14}{'ratio':>9}")
+    for name, r in new["results"].items():
+        o = old["results"].get(name)
+        if o is None:
+            continue
+        field, higher_is_better = ("rate", True) if "rate" in r else ("bytes", False)
+        ratio = r[field] / o[field] if o[field] else float("inf")
+        worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        flag = "  <-- slower" if worse and higher_is_better else ""
+        flag = "  <-- more memory" if worse and not higher_is_better else flag
+        print(f"{name:<28}{o[field]:>14.1f}{r[field]:>14.1f}{ratio:>9.2f}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def _print_report(report: Dict[str, Any]):
+    for name, r in report["results"].items():
+        if "rate" in r:
+            line = f"{name:<28}{r['rate']:>14,.0f} {r['unit']}"
+            if "untabled_rate" in r:
+                line += f" (untabled: {r['untabled_rate']:,.0f})"
+        else:
+            line = f"{name:<28}{r['blocks']:>8.1f} blocks {r['bytes']:>8.0f} bytes"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="JSON report of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_all(args.scale, args.seed)
+    _print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print()
+        if compare(old, report, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Play many games of Farkle in parallel on a process pool
+
+Every game gets its own seed, derived from a master seed with
+`numpy.random.SeedSequence`. The outcome of game `i` therefore depends
+only on the master seed and `i`, not on the number of workers or on
+which worker happened to play it.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import os
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from farkle import DiceRNG, Farkle, FarklePlayer, HumanFarklePlayer, State
+
+
+class GameResult(NamedTuple):
+    game: int
+    seed: int
+    winners: Tuple[bool, ...]
+    scores: Tuple[int, ...]
+    rounds: int
+    n_actions: int
+    terminal_state: State
+
+
+def game_seeds(seed: int, n_games: int) -> List[int]:
+    """One independent seed per game, derived from the master `seed`"""
+    children = np.random.SeedSequence(seed).spawn(n_games)
+    return [int(c.generate_state(1, dtype=np.uint64)[0]) for c in children]
+
+
+def _seeded_players(
+    players: Sequence[FarklePlayer], seed: int
+) -> List[FarklePlayer]:
+    # players holding their own `DiceRNG` get a copy with a fresh one derived
+    # from the game's seed, so their draws do not run on from earlier games
+    out = []
+    for p, player in enumerate(players):
+        if isinstance(getattr(player, "rng", None), DiceRNG):
+            player = copy.copy(player)
+            player.rng = DiceRNG([seed, p + 1])
+        out.append(player)
+    return out
+
+
+def _play_games(
+    players: Sequence[FarklePlayer],
+    points_to_win: int,
+    games: Sequence[Tuple[int, int]],
+) -> List[GameResult]:
+    out = []
+    # this also runs in the caller's process (`n_workers=1`), so the global
+    # `random` state is put back afterwards
+    random_state = random.getstate()
+    try:
+        for game, seed in games:
+            out.append(_play_game(players, points_to_win, game, seed))
+    finally:
+        random.setstate(random_state)
+    return out
+
+
+def _play_game(
+    players: Sequence[FarklePlayer], points_to_win: int, game: int, seed: int
+) -> GameResult:
+    # dice and built-in players draw from the game's `DiceRNG`; players
+    # using the `random` module are seeded as well
+    random.seed(seed)
+    players = _seeded_players(players, seed)
+    f = Farkle(players, points_to_win=points_to_win, history="off", seed=seed)
+    winners = f.play()
+    s = f.state
+    s.rng = None  # no need to send the generator back to the parent
+    return GameResult(
+        game=game,
+        seed=seed,
+        winners=tuple(winners[i] for i in range(f.n_players)),
+        scores=tuple(s.scores),
+        rounds=s.current_round,
+        n_actions=f.n_steps,
+        terminal_state=s,
+    )
+
+
+def play_games_parallel(
+    players: Sequence[FarklePlayer],
+    n_games: int,
+    seed: int = 0,
+    n_workers: Optional[int] = None,
+    points_to_win: int = 10_000,
+    chunks_per_worker: int = 4,
+) -> List[GameResult]:
+    """
+    Play `n_games` games of Farkle between `players` on a process pool
+
+    Parameters
+    ----------
+    players: Sequence[FarklePlayer]
+        The players. They are pickled and sent to each worker, so they must
+        be picklable (any player defined at module level is). A player whose
+        `rng` is a `DiceRNG` plays each game with a copy whose `rng` is
+        seeded from that game's seed; players using `random` get it seeded
+        the same way. Any other state a player changes while playing carries
+        over to the next games in its chunk, so results only depend on the
+        master seed for players that keep no such state
+    n_games: int
+        The number of games to play
+    seed: int, default=0
+        The master seed. Game `i` is always played with `game_seeds(seed,
+        n_games)[i]`
+    n_workers: Optional[int]
+        The number of worker processes. Defaults to `os.cpu_count()`. With
+        `n_workers=1` the games are played in this process
+    points_to_win: int, default=10_000
+        Passed on to `Farkle`
+    chunks_per_worker: int, default=4
+        Games are sent to the workers in `n_workers * chunks_per_worker`
+        chunks, which keeps the workers busy when game lengths vary
+
+    Returns
+    -------
+    results: List[GameResult]
+        One result per game, ordered by game number
+    """
+    if any(isinstance(p, HumanFarklePlayer) for p in players):
+        raise ValueError("Human players cannot play in a process pool")
+
+    games = list(enumerate(game_seeds(seed, n_games)))
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        return _play_games(players, points_to_win, games)
+
+    n_chunks = min(len(games), n_workers * chunks_per_worker)
+    chunks = [games[i::n_chunks] for i in range(n_chunks)]
+    results: List[GameResult] = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [
+            pool.submit(_play_games, players, points_to_win, chunk)
+            for chunk in chunks
+        ]
+        for fut in futures:
+            results.extend(fut.result())
+
+    results.sort(key=lambda r: r.game)
+    return results
+
+
+def summarize(results: Sequence[GameResult]) -> Dict[str, Any]:
+    """
+    Merge per-game results into win/loss counts and average statistics
+
+    A player wins a game if they reached `points_to_win`; more than one
+    player can win the same game (see `Farkle.play`).
+    """
+    n_games = len(results)
+    n_players = len(results[0].scores) if results else 0
+    wins = [sum(r.winners[p] for r in results) for p in range(n_players)]
+    return {
+        "n_games": n_games,
+        "wins": wins,
+        "losses": [n_games - w for w in wins],
+        "win_rate": [w / n_games for w in wins] if n_games else [],
+        "ties": sum(sum(r.winners) > 1 for r in results),
+        "mean_score": [
+            sum(r.scores[p] for r in results) / n_games for p in range(n_players)
+        ],
+        "mean_rounds": sum(r.rounds for r in results) / max(n_games, 1),
+        "mean_actions": sum(r.n_actions for r in results) / max(n_games, 1),
+    }
@@ -0,0 +1,180 @@
+"""
+Solve for the turn strategy that maximizes the expected score of a turn
+
+Within a single turn of Farkle the state that matters is
+`State.observable_state()`: `(can_roll, turn_sum, dice)`. Every scoring
+action adds at least 50 points to `turn_sum` and rolling never lowers it,
+so the states can be ordered by `turn_sum` and solved exactly by backward
+induction, from the highest `turn_sum` down to 0.
+
+The only approximation is a cap on `turn_sum`: once a turn is worth more
+than `max_turn_sum` points we assume the player banks it. With the
+default cap of 10,000 (the points needed to win a game) this does not
+change any decision made in practice.
+"""
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import factorial
+from typing import Dict, List, Tuple
+
+from farkle import (
+    BANKRUPT,
+    ROLL,
+    STOP,
+    Action,
+    FarklePlayer,
+    State,
+    scoring_options,
+)
+
+Dice = Tuple[int, ...]
+
+
+@lru_cache(maxsize=None)
+def roll_distribution(n_dice: int) -> Tuple[Tuple[Dice, float], ...]:
+    """
+    The distribution of the sorted outcome of rolling `n_dice` dice
+
+    Returns
+    -------
+    outcomes : Tuple[Tuple[Dice, float], ...]
+        Pairs of (sorted dice values, probability)
+    """
+    out = []
+    for dice in combinations_with_replacement(range(1, 7), n_dice):
+        n_orders = factorial(n_dice)
+        for face in set(dice):
+            n_orders //= factorial(dice.count(face))
+        out.append((dice, n_orders / 6**n_dice))
+    return tuple(out)
+
+
+@lru_cache(maxsize=None)
+def _moves(dice: Dice) -> Tuple[Tuple[int, Dice], ...]:
+    # (points, remaining dice) for each scoring option of `dice`
+    out = []
+    for a in scoring_options(dice):
+        remaining = list(dice)
+        for k in a.used:
+            remaining.remove(k)
+        out.append((a.value, tuple(remaining)))
+    return tuple(out)
+
+
+class TurnSolver:
+    """
+    Exact expected turn score for every in-turn state of Farkle
+
+    Parameters
+    ----------
+    max_turn_sum: int, default=10_000
+        Turns worth more than this are assumed to be banked
+
+    Attributes
+    ----------
+    values: Dict[Tuple[int, int, Dice], float]
+        The expected final turn score under optimal play, keyed by
+        `State.observable_state()`. Keys with `can_roll == 0` are states
+        right after a roll; the others are states after playing dice
+    roll_values: Dict[Tuple[int, int], float]
+        The expected final turn score of choosing ROLL with
+        `(can_roll, turn_sum)`
+    """
+
+    def __init__(self, max_turn_sum: int = 10_000):
+        self.max_turn_sum = max_turn_sum
+        self.values: Dict[Tuple[int, int, Dice], float] = {}
+        self.roll_values: Dict[Tuple[int, int], float] = {}
+
+    def solve(self) -> "TurnSolver":
+        after_roll = [d for n in range(1, 7) for d, _ in roll_distribution(n)]
+        after_play = [
+            d
+            for n in range(6)
+            for d in combinations_with_replacement(range(1, 7), n)
+        ]
+        values, roll_values = self.values, self.roll_values
+
+        # all points are multiples of 50
+        for t in range(self.max_turn_sum // 50 * 50, -1, -50):
+            # just rolled: must score or go bankrupt
+            for dice in after_roll:
+                moves = _moves(dice)
+                if moves:
+                    values[(0, t, dice)] = max(
+                        self._after_play(t + v, rest) for v, rest in moves
+                    )
+                else:
+                    values[(0, t, dice)] = 0.0
+
+            for n in range(1, 7):
+                roll_values[(n, t)] = sum(
+                    p * values[(0, t, dice)] for dice, p in roll_distribution(n)
+                )
+
+            # played some dice: score more, roll the rest or stop
+            for dice in after_play:
+                can_roll = len(dice) or 6
+                best = roll_values[(can_roll, t)]
+                moves = _moves(dice)
+                for v, rest in moves:
+                    best = max(best, self._after_play(t + v, rest))
+                if not moves and t > 0:
+                    best = max(best, t)
+                values[(can_roll, t, dice)] = best
+
+        return self
+
+    def _after_play(self, t: int, dice: Dice) -> float:
+        if t > self.max_turn_sum:
+            return float(t)
+        return self.values[(len(dice) or 6, t, dice)]
+
+    def roll_value(self, can_roll: int, turn_sum: int) -> float:
+        if can_roll == 0:
+            # rolling no dice can only go bankrupt
+            return 0.0
+        if turn_sum > self.max_turn_sum:
+            return float(turn_sum)
+        return self.roll_values[(can_roll, turn_sum)]
+
+    def action_value(self, state: State, action: Action) -> float:
+        """The expected final turn score of taking `action` in `state`"""
+        t = state.turn_sum
+        if action is STOP:
+            return float(t)
+        if action is BANKRUPT:
+            return 0.0
+        if action is ROLL:
+            return self.roll_value(state.can_roll, t)
+
+        remaining = list(state.dice)
+        for k in action.used:
+            remaining.remove(k)
+        return self._after_play(t + action.value, tuple(remaining))
+
+    def best_action(self, state: State, choices: List[Action]) -> Action:
+        return max(choices, key=lambda a: self.action_value(state, a))
+
+
+@lru_cache(maxsize=None)
+def solve_turn(max_turn_sum: int = 10_000) -> TurnSolver:
+    """A solved `TurnSolver`, computed once per `max_turn_sum`"""
+    return TurnSolver(max_turn_sum).solve()
+
+
+class OptimalTurnFarklePlayer(FarklePlayer):
+    """
+    A player that maximizes the expected score of each turn
+
+    The solution is computed on construction (a few seconds) and shared
+    between players with the same `max_turn_sum`.
+    """
+
+    name = "optimal_turn_robot"
+
+    def __init__(self, max_turn_sum: int = 10_000):
+        self.solver = solve_turn(max_turn_sum)
+
+    def act(self, state: State, choices: List[Action]) -> Action:
+        return self.solver.best_action(state, choices)
@@ -4,11 +4,30 @@ from mesa import Agent, Model
 from mesa.time import RandomActivation
 from mesa.space import SingleGrid
 from mesa.datacollection import DataCollector
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import numpy as np
 import random
+from object_cache import ObjectCache
 
 abm_mcp = FastMCP("AgentBasedModels")
-abm_cache: Dict[str, Any] = {}
+# Least recently used models are dropped (or written to CACHE_SPILL_DIR, if
+# set) once there are more than CACHE_MAX_MODELS or they use CACHE_MAX_BYTES
+CACHE_MAX_MODELS = 100
+CACHE_MAX_BYTES = 2**30
+CACHE_SPILL_DIR = None
+abm_cache = ObjectCache(
+    max_bytes=CACHE_MAX_BYTES, max_items=CACHE_MAX_MODELS, spill_dir=CACHE_SPILL_DIR
+)
+
+# Approximate memory use of one Mesa Schelling agent (with its grid cell and
+# schedule entry) and of one recorded DataCollector value, measured with
+# object_cache.estimate_size
+AGENT_BYTES = 1400
+RECORD_BYTES = 32
+
+def segregation(model):
+    """DataCollector reporter. A module-level function, so that models pickle."""
+    return model.measure_segregation(model)
 
 class SchellingAgent(Agent):
     def __init__(self, unique_id, model, agent_type):
@@ -20,7 +39,7 @@ class SchellingAgent(Agent):
         similar = sum(1 for n in neighbors if n.type == self.type)
         total = len(neighbors)
         if total > 0 and (similar / total) < self.model.homophily:
-            self.model.grid.move_to_empty(self)
+            self.model.relocate(self)
 
 class SchellingModel(Model):
     def __init__(self, width=20, height=20, density=0.8, minority_pc=0.2, homophily=3):
@@ -28,27 +47,188 @@ class SchellingModel(Model):
         self.homophily = homophily / 8
         self.schedule = RandomActivation(self)
         self.grid = SingleGrid(width, height, torus=True)
+        # Summed over all agents: neighbors of the same type, and all neighbors.
+        # Kept up to date as agents are placed and moved, so measuring
+        # segregation does not have to visit every agent.
+        self.similar_neighbors = 0
+        self.total_neighbors = 0
         n_agents = int(width * height * density)
-        for i in range(n_agents):
+        cells = random.sample(range(width * height), n_agents)
+        for i, cell in enumerate(cells):
             agent_type = 1 if random.random() < minority_pc else 0
             agent = SchellingAgent(i, self, agent_type)
             self.schedule.add(agent)
-            self.grid.position_agent(agent, (random.randrange(width), random.randrange(height)))
-        self.datacollector = DataCollector(model_reporters={"segregation": lambda m: self.measure_segregation(m)})
+            self.grid.place_agent(agent, divmod(cell, height))
+            self._count_neighbors(agent, 1)
+        self.initial_segregation = self.measure_segregation(self)
+        self.steps_run = 0
+        self.last_moves = 0  # agents that moved in the last step
+        self.datacollector = DataCollector(model_reporters={"segregation": segregation})
+
+    def _count_neighbors(self, agent, sign):
+        # Add (sign=1) or remove (sign=-1) the neighbor pairs of an agent at its
+        # current cell. Each pair is counted once from either end.
+        for n in self.grid.iter_neighbors(agent.pos, moore=True, include_center=False):
+            self.total_neighbors += 2 * sign
+            if n.type == agent.type:
+                self.similar_neighbors += 2 * sign
+
+    def relocate(self, agent):
+        """Move an agent to a random empty cell, updating the neighbor counters."""
+        self._count_neighbors(agent, -1)
+        self.grid.move_to_empty(agent)
+        self._count_neighbors(agent, 1)
+        self.last_moves += 1
+
+    @property
+    def nbytes(self) -> int:
+        # estimated from counts, so the cache does not walk every agent
+        records = len(self.datacollector.model_vars["segregation"])
+        return AGENT_BYTES * len(self.schedule.agents) + RECORD_BYTES * records
 
     @staticmethod
     def measure_segregation(model):
-        similar_neighbors = total_neighbors = 0
-        for agent in model.schedule.agents:
-            neighbors = model.grid.get_neighbors(agent.pos, moore=True, include_center=False)
-            if neighbors:
-                similar_neighbors += sum(1 for n in neighbors if n.type == agent.type)
-                total_neighbors += len(neighbors)
-        return similar_neighbors / total_neighbors if total_neighbors > 0 else 0
+        if model.total_neighbors == 0:
+            return 0
+        return model.similar_neighbors / model.total_neighbors
+
+    def advance(self):
+        """Run one step without collecting data."""
+        self.last_moves = 0
+        self.schedule.step()
+        self.steps_run += 1
 
     def step(self):
         self.datacollector.collect(self)
-        self.schedule.step()
+        self.advance()
+
+class ArraySchellingModel:
+    """
+    Schelling model on a 2-D NumPy array, for grids too large for SchellingModel.
+
+    The grid holds -1 for empty cells and the agent type (0 or 1) otherwise, on
+    the same torus as SchellingModel. Neighbor counts are computed for the whole
+    grid at once with np.roll, and they give both the unhappy agents and the
+    segregation measure.
+
+    Unlike SchellingModel, where agents move one at a time and see the moves
+    made before theirs, all agents unhappy at the start of a step move together:
+    they are shuffled into the empty cells plus the cells they leave.
+
+    Args:
+        width: Grid width
+        height: Grid height
+        density: Fraction of cells occupied (0-1)
+        minority_pc: Fraction of agents that are minority type (0-1)
+        homophily: Number of similar neighbors desired (out of 8)
+        seed: Seed for the model's random generator
+    """
+
+    def __init__(self, width=20, height=20, density=0.8, minority_pc=0.2, homophily=3,
+                 seed: Optional[int] = None):
+        self.homophily = homophily / 8
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.num_agents = int(width * height * density)
+        cells = np.full(width * height, -1, dtype=np.int8)
+        cells[:self.num_agents] = self.rng.random(self.num_agents) < minority_pc
+        self.grid = self.rng.permutation(cells).reshape(width, height)
+        self._update_counts()
+        self.initial_segregation = self.measure_segregation(self)
+        self.steps_run = 0
+        self.last_moves = 0  # agents that moved in the last step
+        self.datacollector = DataCollector(model_reporters={"segregation": segregation})
+
+    @staticmethod
+    def _neighbor_sum(a: np.ndarray) -> np.ndarray:
+        # sum over the 8 Moore neighbors of every cell, wrapping at the edges
+        s = a + np.roll(a, 1, axis=0) + np.roll(a, -1, axis=0)
+        s = s + np.roll(s, 1, axis=1) + np.roll(s, -1, axis=1)
+        return s - a
+
+    def _update_counts(self):
+        occupied = self.grid >= 0
+        # at most 8 neighbors, so int8 is enough
+        total = self._neighbor_sum(occupied.astype(np.int8))
+        minority = self._neighbor_sum((self.grid == 1).astype(np.int8))
+        similar = np.where(self.grid == 1, minority, total - minority)
+        self.occupied = occupied
+        self.similar = np.where(occupied, similar, 0)
+        self.total = np.where(occupied, total, 0)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = sum(a.nbytes for a in (self.grid, self.similar, self.total, self.occupied))
+        records = len(self.datacollector.model_vars["segregation"])
+        return arrays + RECORD_BYTES * records
+
+    def unhappy(self) -> np.ndarray:
+        """Flat indices of the agents with too few similar neighbors."""
+        mask = (self.total > 0) & (self.similar < self.homophily * self.total)
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def measure_segregation(model):
+        total_neighbors = int(model.total.sum(dtype=np.int64))
+        if total_neighbors == 0:
+            return 0
+        return int(model.similar.sum(dtype=np.int64)) / total_neighbors
+
+    def advance(self):
+        """Run one step without collecting data."""
+        self.steps_run += 1
+        movers = self.unhappy()
+        self.last_moves = len(movers)
+        if len(movers) == 0:
+            return
+        cells = self.grid.reshape(-1)
+        types = cells[movers]
+        targets = np.concatenate([np.flatnonzero(cells < 0), movers])
+        cells[movers] = -1
+        cells[self.rng.choice(targets, size=len(movers), replace=False)] = types
+        self._update_counts()
+
+    def step(self):
+        self.datacollector.collect(self)
+        self.advance()
+
+# Samples preallocated by a fast-forward step_model call; the array doubles
+# when a longer run fills it
+FAST_FORWARD_PREALLOC = 4096
+
+def _fast_forward(model, num_steps: int, record_every: int) -> Dict[str, Any]:
+    # Advance without the DataCollector, keeping the segregation after every
+    # record_every-th step (and the last one) in a preallocated array. It is
+    # sized for at most FAST_FORWARD_PREALLOC samples, since a run may stop at
+    # equilibrium long before num_steps
+    record = np.empty(min(max(num_steps, 0) // record_every + 1, FAST_FORWARD_PREALLOC))
+    n_recorded = 0
+    moves = 0
+    steps = 0
+    equilibrium = False
+    while steps < num_steps and not equilibrium:
+        model.advance()
+        steps += 1
+        moves += model.last_moves
+        # nobody moved, so nobody was unhappy: later steps would change nothing
+        equilibrium = model.last_moves == 0
+        if steps % record_every == 0 or steps == num_steps or equilibrium:
+            if n_recorded == len(record):
+                record = np.concatenate([record, np.empty_like(record)])
+            record[n_recorded] = model.measure_segregation(model)
+            n_recorded += 1
+
+    record = record[:n_recorded] if n_recorded else np.array([model.measure_segregation(model)])
+    return {
+        "steps_completed": steps,
+        "equilibrium": bool(equilibrium),
+        "agents_moved": int(moves),
+        "samples": int(n_recorded),
+        "min_segregation": round(float(record.min()), 3),
+        "max_segregation": round(float(record.max()), 3),
+        "mean_segregation": round(float(record.mean()), 3)
+    }
 
 @abm_mcp.tool()
 def create_schelling_model(
@@ -57,7 +237,9 @@ def create_schelling_model(
     height: int = 20,
     density: float = 0.8,
     minority_percent: float = 0.2,
-    homophily: int = 3
+    homophily: int = 3,
+    backend: str = "mesa",
+    seed: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Create a Schelling segregation model.
@@ -72,49 +254,90 @@ def create_schelling_model(
         density: Fraction of cells occupied (0-1, default 0.8)
         minority_percent: Fraction of agents that are minority type (0-1, default 0.2)
         homophily: Number of similar neighbors desired (out of 8, default 3)
+        backend: "mesa" for one Mesa agent per cell, or "numpy" for a vectorized
+                 grid that handles 1000x1000 and larger (default "mesa")
+        seed: Random seed for the "numpy" backend (default None)
 
     Returns:
         Model configuration and initial state
     """
-    model = SchellingModel(width, height, density, minority_percent, homophily)
+    if backend == "numpy":
+        model = ArraySchellingModel(width, height, density, minority_percent, homophily, seed)
+        num_agents = model.num_agents
+    elif backend == "mesa":
+        model = SchellingModel(width, height, density, minority_percent, homophily)
+        num_agents = len(model.schedule.agents)
+    else:
+        return {"error": f"Unknown backend '{backend}', expected 'mesa' or 'numpy'"}
     abm_cache[model_id] = model
     return {
         "model_id": model_id,
+        "backend": backend,
         "width": width,
         "height": height,
-        "num_agents": len(model.schedule.agents),
+        "num_agents": num_agents,
         "initial_segregation": round(model.measure_segregation(model), 3)
     }
 
 @abm_mcp.tool()
 def step_model(
     model_id: str,
-    num_steps: int = 1
+    num_steps: int = 1,
+    fast_forward: bool = False,
+    record_every: int = 1
 ) -> Dict[str, Any]:
     """
     Run the model for a specified number of steps.
 
+    By default every step is recorded by the model's DataCollector. With
+    fast_forward=True the DataCollector is skipped, segregation is sampled
+    every record_every steps, and the run stops early once no agent is unhappy.
+
     Args:
         model_id: ID of the model to step
         num_steps: Number of steps to run (default 1)
+        fast_forward: Skip per-step data collection and stop at equilibrium
+                      (default False)
+        record_every: With fast_forward, sample segregation every this many
+                      steps (default 1)
 
     Returns:
-        Segregation metrics after stepping
+        Segregation metrics after stepping; with fast_forward, also whether
+        equilibrium was reached, the number of moves and min/max/mean
+        segregation over the samples
     """
     model = abm_cache.get(model_id)
     if model is None:
         return {"error": f"Model '{model_id}' not found"}
+    if record_every < 1:
+        return {"error": "record_every must be at least 1"}
 
-    for _ in range(num_steps):
-        model.step()
+    if fast_forward:
+        result = _fast_forward(model, num_steps, record_every)
+    else:
+        for _ in range(num_steps):
+            model.step()
+        result = {"steps_completed": num_steps}
+    # the DataCollector history has grown
+    abm_cache.resize(model_id)
 
-    df = model.datacollector.get_model_vars_dataframe()
     return {
         "model_id": model_id,
-        "steps_completed": num_steps,
-        "total_steps": len(df),
-        "current_segregation": round(df['segregation'].iloc[-1], 3),
-        "initial_segregation": round(df['segregation'].iloc[0], 3)
+        **result,
+        "total_steps": model.steps_run,
+        "current_segregation": round(model.measure_segregation(model), 3),
+        "initial_segregation": round(model.initial_segregation, 3)
     }
 
+@abm_mcp.tool()
+def cache_stats() -> Dict[str, Any]:
+    """
+    Report how the server's model cache is doing.
+
+    Returns:
+        Dictionary with hit/miss/eviction counters, the number of cached models
+        and their estimated size in bytes
+    """
+    return abm_cache.stats()
+
 print("✓ ABM MCP server created")
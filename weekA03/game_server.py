@@ -3,9 +3,17 @@ from fastmcp import FastMCP
 import quantecon.game_theory as gt
 import numpy as np
 from typing import Dict, List, Any
+from object_cache import ObjectCache
 
 game_mcp = FastMCP("GameTheory")
-game_cache: Dict[str, Any] = {}
+# Least recently used games are dropped (or written to CACHE_SPILL_DIR, if
+# set) once there are more than CACHE_MAX_GAMES or they use CACHE_MAX_BYTES
+CACHE_MAX_GAMES = 1000
+CACHE_MAX_BYTES = 256 * 2**20
+CACHE_SPILL_DIR = None
+game_cache = ObjectCache(
+    max_bytes=CACHE_MAX_BYTES, max_items=CACHE_MAX_GAMES, spill_dir=CACHE_SPILL_DIR
+)
 
 @game_mcp.tool()
 def create_game(
@@ -66,4 +74,15 @@ def find_pure_nash_equilibria(game_id: str) -> Dict[str, Any]:
         "equilibria": results
     }
 
+@game_mcp.tool()
+def cache_stats() -> Dict[str, Any]:
+    """
+    Report how the server's game cache is doing.
+
+    Returns:
+        Dictionary with hit/miss/eviction counters, the number of cached games
+        and their estimated size in bytes
+    """
+    return game_cache.stats()
+
 print("✓ Game Theory MCP server created")
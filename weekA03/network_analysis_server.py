@@ -1,18 +1,289 @@
 
 from fastmcp import FastMCP
 import networkx as nx
-from typing import Dict, List, Tuple, Any
+import numpy as np
+import os
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from typing import Dict, List, Tuple, Any, Optional, Union
+from object_cache import ObjectCache
 
 # Global cache for persistent state across tool calls
-# MCP Context is request-scoped, so we need external storage
-cache: Dict[str, Any] = {}
+# MCP Context is request-scoped, so we need external storage.
+# Each graph is one GraphEntry under f"graph:{graph_id}". Least recently used
+# graphs are dropped (or written to CACHE_SPILL_DIR, if set) once the cache
+# holds more than CACHE_MAX_BYTES
+CACHE_MAX_BYTES = 2**30
+CACHE_SPILL_DIR = None
+cache = ObjectCache(max_bytes=CACHE_MAX_BYTES, spill_dir=CACHE_SPILL_DIR)
+# Last version number given to each graph_id. Kept outside the cache, so
+# versions keep increasing even after a graph was evicted and created again
+versions: Dict[str, int] = {}
+
+# Most BFS trees kept per graph for find_shortest_path
+MAX_BFS_TREES = 64
+
+# load_network only reads files inside this directory
+DATA_DIR = os.environ.get(
+    "NETWORK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+EDGE_FILE_TYPES = (".npy", ".lg", ".csv", ".txt")
 
 network_mcp = FastMCP("NetworkAnalysis")
 
+
+class CSRGraph:
+    """
+    A read-only undirected graph stored as a SciPy CSR adjacency matrix.
+
+    Uses about 10 bytes per edge, against several hundred for nx.Graph, and is
+    built from an edge array in one vectorized pass. Nodes keep their original
+    integer IDs; row i of the matrix is node nodes[i].
+
+    It supports the parts of the nx.Graph interface used by the tools below
+    (`node in G`, degree, number_of_nodes, number_of_edges), and to_networkx
+    for everything else.
+    """
+
+    def __init__(self, nodes: np.ndarray, adj: sp.csr_matrix):
+        self.nodes = nodes
+        self.adj = adj
+        self.self_loops = adj.diagonal() > 0
+
+    @classmethod
+    def from_edges(cls, edges) -> "CSRGraph":
+        edges = np.asarray(edges).reshape(-1, 2)
+        nodes, inverse = np.unique(edges.ravel(), return_inverse=True)
+        u, v = inverse.reshape(-1, 2).T
+        n = len(nodes)
+        rows, cols = np.concatenate([u, v]), np.concatenate([v, u])
+        adj = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n)
+        )
+        adj.sum_duplicates()
+        adj.data[:] = 1
+        return cls(nodes, adj)
+
+    def index(self, node: int) -> int:
+        """Row of `node` in the adjacency matrix, or -1 if it is not in the graph."""
+        i = int(np.searchsorted(self.nodes, node))
+        return i if i < len(self.nodes) and self.nodes[i] == node else -1
+
+    def __contains__(self, node) -> bool:
+        return self.index(node) >= 0
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        # self loops are stored once, every other edge twice
+        return int(self.adj.nnz + self.self_loops.sum()) // 2
+
+    def degree(self, node: int) -> int:
+        # a self loop adds two to the degree, as in networkx
+        i = self.index(node)
+        return int(self.adj.indptr[i + 1] - self.adj.indptr[i] + self.self_loops[i])
+
+    def density(self) -> float:
+        n = self.number_of_nodes()
+        return 2 * self.number_of_edges() / (n * (n - 1)) if n > 1 else 0.0
+
+    def bfs_predecessors(self, node: int) -> np.ndarray:
+        """BFS tree from `node`: predecessor row of each row, negative if unreachable."""
+        _, pred = csgraph.breadth_first_order(
+            self.adj, self.index(node), directed=True, return_predecessors=True
+        )
+        return pred
+
+    def path(self, pred: np.ndarray, source: int, target: int) -> Optional[List[int]]:
+        """Path from `source` to `target` in the BFS tree `pred`, or None."""
+        i, j = self.index(source), self.index(target)
+        rows = [j]
+        while rows[-1] != i:
+            if pred[rows[-1]] < 0:
+                return None
+            rows.append(pred[rows[-1]])
+        return self.nodes[rows[::-1]].tolist()
+
+    def to_networkx(self) -> nx.Graph:
+        G = nx.Graph()
+        G.add_nodes_from(self.nodes.tolist())
+        upper = sp.triu(self.adj).tocoo()
+        rows, cols = self.nodes[upper.row].tolist(), self.nodes[upper.col].tolist()
+        G.add_edges_from(zip(rows, cols))
+        return G
+
+    @property
+    def nbytes(self) -> int:
+        a = self.adj
+        return a.data.nbytes + a.indices.nbytes + a.indptr.nbytes + self.nodes.nbytes
+
+
+Graph = Union[nx.Graph, CSRGraph]
+
+# Approximate memory use of nx.Graph per node and per edge, and of one entry of
+# a dict keyed by node (beyond the node objects the graph already holds),
+# measured with object_cache.estimate_size
+NX_NODE_BYTES = 240
+NX_EDGE_BYTES = 140
+NODE_ITEM_BYTES = 50
+
+
+class GraphEntry:
+    """
+    A graph stored in the cache, with its derived results.
+
+    They form one cache entry, so they are evicted (or spilled) together.
+
+    metrics holds derived results (centralities, components, BFS trees).
+    create_network starts with none; add_edges and remove_edges keep whatever
+    is still valid (see _edges_added and _edges_removed).
+
+    nbytes is estimated from node, edge and result counts instead of walking
+    the graph, so it is cheap to re-measure after every change. n_edges is
+    kept up to date by add_edges and remove_edges for the same reason.
+    """
+
+    def __init__(self, graph: "Graph"):
+        self.graph = graph
+        self.metrics: Dict[Any, Any] = {}
+        self.n_edges = graph.number_of_edges()
+
+    @property
+    def nbytes(self) -> int:
+        G = self.graph
+        if isinstance(G, CSRGraph):
+            size = G.nbytes
+        else:
+            size = NX_NODE_BYTES * G.number_of_nodes() + NX_EDGE_BYTES * self.n_edges
+        for key, value in self.metrics.items():
+            if key == "bfs":
+                size += sum(NODE_ITEM_BYTES * (len(p) + len(d)) for p, d in value.values())
+            elif key == "components":
+                # a label per node, and each node in one member list
+                size += 2 * NODE_ITEM_BYTES * len(value["label"])
+            elif key == "csr_components":
+                size += sum(a.nbytes for a in value[1:])
+            elif key == "csr_bfs":
+                size += sum(a.nbytes for a in value.values())
+            else:  # betweenness, node -> float
+                size += NODE_ITEM_BYTES * len(value)
+        return size
+
+
+def _bump_version(graph_id: str) -> int:
+    versions[graph_id] = versions.get(graph_id, -1) + 1
+    return versions[graph_id]
+
+
+def _edges_added(entry: GraphEntry, edges: List[Tuple[int, int]]):
+    """Update the cached metrics of a graph after `edges` were added to it."""
+    metrics = entry.metrics
+    for key in [k for k in metrics if k[0] == "betweenness"]:
+        del metrics[key]
+
+    # a BFS tree stays a shortest-path tree unless a new edge joins nodes at
+    # distances that differ by more than one, or reaches a new node
+    trees = metrics.get("bfs", {})
+    for source in list(trees):
+        _, dist = trees[source]
+        for u, v in edges:
+            du, dv = dist.get(u), dist.get(v)
+            if (du is None) != (dv is None) or (du is not None and abs(du - dv) > 1):
+                del trees[source]
+                break
+
+    # merge the components joined by the new edges
+    comps = metrics.get("components")
+    if comps is not None:
+        label, members = comps["label"], comps["members"]
+        for u, v in edges:
+            for n in (u, v):
+                if n not in label:
+                    label[n] = n
+                    members[n] = [n]
+            a, b = label[u], label[v]
+            if a != b:
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                for n in members[b]:
+                    label[n] = a
+                members[a].extend(members.pop(b))
+
+
+def _edges_removed(entry: GraphEntry, edges: List[Tuple[int, int]]):
+    """Update the cached metrics of a graph after `edges` were removed from it."""
+    metrics = entry.metrics
+    for key in [k for k in metrics if k[0] == "betweenness"]:
+        del metrics[key]
+
+    # distances can only grow, so a BFS tree is still valid if it did not
+    # use any of the removed edges
+    trees = metrics.get("bfs", {})
+    for source in list(trees):
+        parents, _ = trees[source]
+        if any(parents.get(v) == u or parents.get(u) == v for u, v in edges):
+            del trees[source]
+
+    # a removed edge may split a component; recompute on the next request
+    metrics.pop("components", None)
+
+
+def _components(entry: GraphEntry) -> Dict[str, Any]:
+    metrics = entry.metrics
+    if "components" not in metrics:
+        label, members = {}, {}
+        for comp in nx.connected_components(entry.graph):
+            root = next(iter(comp))
+            members[root] = list(comp)
+            for n in comp:
+                label[n] = root
+        metrics["components"] = {"label": label, "members": members}
+    return metrics["components"]
+
+
+def _betweenness(entry: GraphEntry, k: Optional[int], seed: int) -> Dict[int, float]:
+    # exact betweenness ignores the seed, so it is cached once
+    key = ("betweenness", k, seed if k is not None else None)
+    metrics = entry.metrics
+    if key not in metrics:
+        G = entry.graph
+        if isinstance(G, CSRGraph):
+            G = G.to_networkx()
+        if k is not None and k < G.number_of_nodes():
+            metrics[key] = nx.betweenness_centrality(G, k=k, seed=seed)
+        else:
+            metrics[key] = nx.betweenness_centrality(G)
+    return metrics[key]
+
+
+def _bfs_parents(entry: GraphEntry, source: int) -> Dict[int, int]:
+    # parent of every node reachable from source in a BFS tree
+    G = entry.graph
+    trees = entry.metrics.setdefault("bfs", {})
+    if source not in trees:
+        if len(trees) >= MAX_BFS_TREES:
+            trees.pop(next(iter(trees)))
+        parents, dist = {source: source}, {source: 0}
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for u in frontier:
+                for v in G.adj[u]:
+                    if v not in dist:
+                        parents[v] = u
+                        dist[v] = dist[u] + 1
+                        next_frontier.append(v)
+            frontier = next_frontier
+        # distances are kept to tell whether the tree survives new edges
+        trees[source] = (parents, dist)
+    return trees[source][0]
+
 @network_mcp.tool()
 def create_network(
     graph_id: str,
-    edges: List[Tuple[int, int]]
+    edges: List[Tuple[int, int]],
+    backend: str = "networkx"
 ) -> Dict[str, Any]:
     """
     Create a network from an edge list and store it.
@@ -20,18 +291,235 @@ def create_network(
     Args:
         graph_id: Unique identifier for this graph (e.g., 'social_network', 'graph1')
         edges: List of edges as [source, target] pairs. Example: [[1,2], [2,3], [1,3]]
+        backend: 'networkx' (the default) or 'csr', a compact read-only adjacency
+                 matrix for large graphs. Betweenness on a 'csr' graph converts
+                 it to networkx first
 
     Returns:
         Dictionary with graph statistics (num_nodes, num_edges, density)
     """
-    G = nx.Graph()
-    G.add_edges_from(edges)
-    cache[f"graph:{graph_id}"] = G
+    if backend == "csr":
+        G = CSRGraph.from_edges(edges)
+    elif backend == "networkx":
+        G = nx.Graph()
+        G.add_edges_from(edges)
+    else:
+        return {"error": f"Unknown backend '{backend}'. Use 'networkx' or 'csr'."}
+    return _store_graph(graph_id, G)
+
+def _store_graph(graph_id: str, G: Graph) -> Dict[str, Any]:
+    # replaces (without loading) any cached or spilled graph of the same id
+    cache[f"graph:{graph_id}"] = GraphEntry(G)
+    csr = isinstance(G, CSRGraph)
     return {
         "graph_id": graph_id,
+        "version": _bump_version(graph_id),
+        "backend": "csr" if csr else "networkx",
         "num_nodes": G.number_of_nodes(),
         "num_edges": G.number_of_edges(),
-        "density": round(nx.density(G), 4)
+        "density": round(G.density() if csr else nx.density(G), 4)
+    }
+
+def _data_path(path: str) -> Optional[str]:
+    # resolve path (relative to DATA_DIR) and symlinks; None if it ends up
+    # outside DATA_DIR
+    root = os.path.realpath(DATA_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        return None
+    return full
+
+def _read_edges(path: str) -> np.ndarray:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        # memory-mapped: the file is read as the CSR matrix is built
+        edges = np.load(path, mmap_mode="r")
+    elif ext == ".lg":
+        # header line "n_nodes,n_edges,...", then one "source,target" per line
+        edges = np.loadtxt(path, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2)
+    elif ext in (".csv", ".txt"):
+        try:
+            edges = np.loadtxt(path, delimiter=",", dtype=np.int64, ndmin=2)
+        except ValueError:
+            # header row
+            edges = np.loadtxt(path, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2)
+    else:
+        raise ValueError(f"Unsupported file type '{ext}'. Use .npy, .lg or .csv")
+    if edges.ndim != 2 or edges.shape[1] < 2:
+        raise ValueError(f"Expected an edge array with 2 columns, got shape {edges.shape}")
+    return edges[:, :2]
+
+@network_mcp.tool()
+def load_network(
+    graph_id: str,
+    path: str,
+    backend: str = "csr"
+) -> Dict[str, Any]:
+    """
+    Create a network from an edge list file on the server's disk.
+
+    Large graphs load much faster this way than through create_network, since
+    the edges never pass through JSON.
+
+    Args:
+        graph_id: Unique identifier for this graph
+        path: Path, relative to the server's data directory (DATA_DIR), of a .npy
+              file holding an (m, 2) integer array, a .lg file (like
+              week03/arpanet.lg) or a CSV file with one source,target pair per
+              line. Paths outside the data directory are refused
+        backend: 'csr' (compact and read-only, the default) or 'networkx'
+
+    Returns:
+        Dictionary with graph statistics (num_nodes, num_edges, density)
+    """
+    full_path = _data_path(path)
+    if full_path is None:
+        return {"error": f"'{path}' is outside the data directory"}
+    if os.path.splitext(full_path)[1].lower() not in EDGE_FILE_TYPES:
+        return {"error": f"Unsupported file type. Use one of {', '.join(EDGE_FILE_TYPES)}"}
+    if not os.path.isfile(full_path):
+        return {"error": f"File '{path}' not found in the data directory"}
+    try:
+        edges = _read_edges(full_path)
+    except (OSError, ValueError):
+        # the parser's message can quote the file, so it is not passed on
+        return {"error": f"Could not parse '{path}' as an edge list"}
+
+    if backend == "csr":
+        G = CSRGraph.from_edges(edges)
+    elif backend == "networkx":
+        G = nx.Graph()
+        G.add_edges_from(edges.tolist())
+    else:
+        return {"error": f"Unknown backend '{backend}'. Use 'networkx' or 'csr'."}
+    return _store_graph(graph_id, G)
+
+_READ_ONLY = (
+    "Graph '{}' uses the read-only 'csr' backend. "
+    "Recreate it with backend='networkx' to change it."
+)
+
+@network_mcp.tool()
+def add_edges(
+    graph_id: str,
+    edges: List[Tuple[int, int]]
+) -> Dict[str, Any]:
+    """
+    Add edges to an existing network.
+
+    The graph is changed in place and its version number goes up by one.
+    Cached results that the new edges do not affect are kept.
+
+    Args:
+        graph_id: ID of the graph to change
+        edges: List of edges as [source, target] pairs. New nodes are created as needed
+
+    Returns:
+        Dictionary with the new version, graph size and number of edges added
+    """
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
+        return {"error": f"Graph '{graph_id}' not found. Create it first."}
+    G = entry.graph
+    if isinstance(G, CSRGraph):
+        return {"error": _READ_ONLY.format(graph_id)}
+
+    new = [(u, v) for u, v in edges if not G.has_edge(u, v)]
+    _edges_added(entry, new)
+    G.add_edges_from(new)
+    entry.n_edges += len(set(frozenset(e) for e in new))
+    cache.resize(f"graph:{graph_id}")
+    return {
+        "graph_id": graph_id,
+        "version": _bump_version(graph_id),
+        "num_nodes": G.number_of_nodes(),
+        "num_edges": entry.n_edges,
+        "added": len(set(frozenset(e) for e in new))
+    }
+
+@network_mcp.tool()
+def remove_edges(
+    graph_id: str,
+    edges: List[Tuple[int, int]]
+) -> Dict[str, Any]:
+    """
+    Remove edges from an existing network.
+
+    The graph is changed in place and its version number goes up by one.
+    Nodes are kept even if they lose all their edges.
+
+    Args:
+        graph_id: ID of the graph to change
+        edges: List of edges as [source, target] pairs
+
+    Returns:
+        Dictionary with the new version, graph size, number of edges removed
+        and the requested edges that were not in the graph
+    """
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
+        return {"error": f"Graph '{graph_id}' not found. Create it first."}
+    G = entry.graph
+    if isinstance(G, CSRGraph):
+        return {"error": _READ_ONLY.format(graph_id)}
+
+    present = [(u, v) for u, v in edges if G.has_edge(u, v)]
+    missing = [[u, v] for u, v in edges if not G.has_edge(u, v)]
+    G.remove_edges_from(present)
+    _edges_removed(entry, present)
+    entry.n_edges -= len(set(frozenset(e) for e in present))
+    cache.resize(f"graph:{graph_id}")
+    return {
+        "graph_id": graph_id,
+        "version": _bump_version(graph_id),
+        "num_nodes": G.number_of_nodes(),
+        "num_edges": entry.n_edges,
+        "removed": len(set(frozenset(e) for e in present)),
+        "missing": missing
+    }
+
+@network_mcp.tool()
+def find_component(
+    graph_id: str,
+    node: int
+) -> Dict[str, Any]:
+    """
+    Find the connected component containing a node.
+
+    Args:
+        graph_id: ID of the graph to analyze
+        node: The node ID to look up
+
+    Returns:
+        Dictionary with the size of the node's component and the number of
+        components in the graph
+    """
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
+        return {"error": f"Graph '{graph_id}' not found"}
+    G = entry.graph
+    if node not in G:
+        return {"error": f"Node {node} not in graph '{graph_id}'"}
+
+    if isinstance(G, CSRGraph):
+        metrics = entry.metrics
+        if "csr_components" not in metrics:
+            n_comps, labels = csgraph.connected_components(G.adj, directed=False)
+            metrics["csr_components"] = (n_comps, labels, np.bincount(labels))
+            cache.resize(f"graph:{graph_id}")
+        n_comps, labels, sizes = metrics["csr_components"]
+        return {
+            "node": node,
+            "component_size": int(sizes[labels[G.index(node)]]),
+            "num_components": int(n_comps)
+        }
+
+    comps = _components(entry)
+    cache.resize(f"graph:{graph_id}")
+    return {
+        "node": node,
+        "component_size": len(comps["members"][comps["label"][node]]),
+        "num_components": len(comps["members"])
     }
 
 @network_mcp.tool()
@@ -52,13 +540,14 @@ def calculate_degree_centrality(
     Returns:
         Dictionary with degree and normalized centrality value
     """
-    G = cache.get(f"graph:{graph_id}")
-    if G is None:
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
         return {"error": f"Graph '{graph_id}' not found. Create it first."}
+    G = entry.graph
     if node not in G:
         return {"error": f"Node {node} not in graph '{graph_id}'"}
 
-    degree = G.degree(node)
+    degree = int(G.degree(node))
     max_possible = G.number_of_nodes() - 1
     normalized = degree / max_possible if max_possible > 0 else 0
     return {"node": node, "degree": degree, "normalized_centrality": round(normalized, 4)}
@@ -66,7 +555,9 @@ def calculate_degree_centrality(
 @network_mcp.tool()
 def calculate_betweenness(
     graph_id: str,
-    node: int
+    node: int,
+    k: Optional[int] = None,
+    seed: int = 0
 ) -> Dict[str, Any]:
     """
     Calculate betweenness centrality for a node.
@@ -74,21 +565,69 @@ def calculate_betweenness(
     Betweenness measures how often a node lies on shortest paths between other nodes.
     High betweenness nodes are 'bridges' connecting different parts of the network.
 
+    The centrality of every node is computed once per graph and reused by later
+    calls until the graph changes.
+
     Args:
         graph_id: ID of the graph to analyze
         node: The node ID to calculate betweenness for
+        k: If given, approximate betweenness from k sampled pivot nodes. Much faster
+           on large graphs
+        seed: Random seed for choosing the k pivots
 
     Returns:
         Dictionary with betweenness centrality value
     """
-    G = cache.get(f"graph:{graph_id}")
-    if G is None:
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
         return {"error": f"Graph '{graph_id}' not found"}
+    G = entry.graph
     if node not in G:
         return {"error": f"Node {node} not in graph '{graph_id}'"}
 
-    betweenness = nx.betweenness_centrality(G)
-    return {"node": node, "betweenness_centrality": round(betweenness[node], 4)}
+    betweenness = _betweenness(entry, k, seed)
+    cache.resize(f"graph:{graph_id}")
+    return {
+        "node": node,
+        "betweenness_centrality": round(betweenness[node], 4),
+        "approximate": k is not None and k < G.number_of_nodes()
+    }
+
+@network_mcp.tool()
+def calculate_betweenness_batch(
+    graph_id: str,
+    nodes: List[int],
+    k: Optional[int] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Calculate betweenness centrality for many nodes in one call.
+
+    Args:
+        graph_id: ID of the graph to analyze
+        nodes: The node IDs to calculate betweenness for
+        k: If given, approximate betweenness from k sampled pivot nodes
+        seed: Random seed for choosing the k pivots
+
+    Returns:
+        Dictionary with a list of {node, betweenness_centrality} results and the
+        requested nodes that are not in the graph
+    """
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
+        return {"error": f"Graph '{graph_id}' not found"}
+    G = entry.graph
+
+    betweenness = _betweenness(entry, k, seed)
+    cache.resize(f"graph:{graph_id}")
+    return {
+        "results": [
+            {"node": n, "betweenness_centrality": round(betweenness[n], 4)}
+            for n in nodes if n in betweenness
+        ],
+        "missing": [n for n in nodes if n not in betweenness],
+        "approximate": k is not None and k < G.number_of_nodes()
+    }
 
 @network_mcp.tool()
 def find_shortest_path(
@@ -107,17 +646,48 @@ def find_shortest_path(
     Returns:
         Dictionary with path and length, or error if no path exists
     """
-    G = cache.get(f"graph:{graph_id}")
-    if G is None:
+    entry = cache.get(f"graph:{graph_id}")
+    if entry is None:
         return {"error": f"Graph '{graph_id}' not found"}
+    G = entry.graph
+    if source not in G or target not in G:
+        return {"found": False, "message": f"One or both nodes not in graph"}
 
-    try:
-        path = nx.shortest_path(G, source, target)
+    # BFS trees are cached per source, so repeated queries from the same
+    # source only walk the path back
+    if isinstance(G, CSRGraph):
+        trees = entry.metrics.setdefault("csr_bfs", {})
+        if source not in trees:
+            if len(trees) >= MAX_BFS_TREES:
+                trees.pop(next(iter(trees)))
+            trees[source] = G.bfs_predecessors(source)
+            cache.resize(f"graph:{graph_id}")
+        path = G.path(trees[source], source, target)
+        if path is None:
+            return {"found": False, "message": f"No path exists between {source} and {target}"}
         return {"found": True, "path": path, "length": len(path) - 1}
-    except nx.NetworkXNoPath:
+
+    parents = _bfs_parents(entry, source)
+    cache.resize(f"graph:{graph_id}")
+    if target not in parents:
         return {"found": False, "message": f"No path exists between {source} and {target}"}
-    except nx.NodeNotFound:
-        return {"found": False, "message": f"One or both nodes not in graph"}
+
+    path = [target]
+    while path[-1] != source:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return {"found": True, "path": path, "length": len(path) - 1}
+
+@network_mcp.tool()
+def cache_stats() -> Dict[str, Any]:
+    """
+    Report how the server's graph cache is doing.
+
+    Returns:
+        Dictionary with hit/miss/eviction counters, the number of cached entries
+        and their estimated size in bytes
+    """
+    return cache.stats()
 
 if __name__ == "__main__":
     network_mcp.run()
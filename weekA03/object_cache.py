@@ -0,0 +1,311 @@
+"""
+A bounded, dict-like object cache for the MCP servers in this folder.
+
+The servers keep graphs, models and games between tool calls in a
+module-level cache. A plain dict grows for as long as the server runs, so
+ObjectCache adds:
+
+- LRU eviction once there are more than max_items entries or their
+  estimated size passes max_bytes
+- optional per-entry time-to-live
+- hit/miss/eviction counters (see stats)
+- optional spilling of evicted entries to disk (pickle, or .npy for NumPy
+  arrays), reloaded the next time they are asked for
+"""
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+_MISSING = object()
+logger = logging.getLogger(__name__)
+
+_COUNTERS = (
+    "hits", "misses", "evictions", "expirations", "spills", "spill_failures", "reloads"
+)
+
+
+def estimate_size(obj: Any, max_objects: int = 100_000) -> int:
+    """
+    Estimate the memory used by an object and everything it references, in bytes.
+
+    Objects with an `nbytes` attribute (NumPy arrays, the servers' graph
+    entries and models) report that, and are not walked. Anything else is
+    walked through containers, __dict__ and __slots__, counting each object
+    once, and stopping after max_objects objects, so large object graphs
+    without `nbytes` are underestimated and slow to measure.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, type):
+            continue
+        seen.add(id(o))
+
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, (int, np.integer)):
+            total += int(nbytes)
+            continue
+
+        total += sys.getsizeof(o, 64)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif not isinstance(o, (str, bytes, int, float, complex, bool)):
+            if hasattr(o, "__dict__"):
+                stack.append(vars(o))
+            for slot in getattr(type(o), "__slots__", ()):
+                value = getattr(o, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+
+class ObjectCache:
+    """
+    A dict-like cache with LRU eviction, a byte budget and TTLs.
+
+    Reads (`cache[key]`, get, `key in cache`) count as uses for the LRU order.
+    Objects that change after being stored should be re-measured with resize;
+    large or often-changed objects should provide a cheap `nbytes` property
+    (see estimate_size).
+
+    Evicted entries that cannot be spilled (e.g. they do not pickle) are
+    dropped, logged, and counted in stats()["spill_failures"].
+
+    Args:
+        max_bytes: Evict least recently used entries while the estimated total
+                   size is above this (None for no limit)
+        max_items: Evict least recently used entries while there are more than
+                   this many (None for no limit)
+        ttl: Default time-to-live of an entry in seconds (None: no expiry)
+        spill_dir: If given, evicted entries are written here and reloaded on
+                   their next use instead of being lost
+        sizer: Function estimating the size of an object in bytes
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = 512 * 2**20,
+        max_items: Optional[int] = None,
+        ttl: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        sizer: Callable[[Any], int] = estimate_size
+    ):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.sizer = sizer
+        # key -> (value, size in bytes, expiry time or None)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # key -> (spill file, expiry time or None)
+        self._spilled: Dict[str, tuple] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    # -- dict interface --------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def keys(self):
+        return list(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    def __delitem__(self, key: str):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                entry = None
+
+            if entry is None and key in self._spilled:
+                entry = self._reload(key)
+
+            if entry is None:
+                self.counters["misses"] += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING):
+        """Store value under key, with the default TTL unless ttl is given."""
+        ttl = self.ttl if ttl is _MISSING else ttl
+        with self._lock:
+            self._remove(key)
+            self._drop_spilled(key)
+            size = self.sizer(value)
+            expires = None if ttl is None else time.monotonic() + ttl
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            self._enforce_limits(keep=key)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                self.set(key, default)
+                value = default
+            return value
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        with self._lock:
+            entry = self._remove(key)
+            if entry is None and key in self._spilled:
+                entry = self._load_spilled(key)
+            if entry is None:
+                if default is _MISSING:
+                    raise KeyError(key)
+                return default
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._spilled):
+                self._drop_spilled(key)
+            self._entries.clear()
+            self._bytes = 0
+
+    # -- size, limits and stats ------------------------------------------------
+
+    def resize(self, key: str):
+        """Re-estimate the size of an entry after it was changed in place."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            value, size, expires = entry
+            new_size = self.sizer(value)
+            self._entries[key] = (value, new_size, expires)
+            self._bytes += new_size - size
+            self._enforce_limits(keep=key)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated size of the entries held in memory."""
+        return self._bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus the current number of entries and their estimated size."""
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "spilled_entries": len(self._spilled),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_items": self.max_items
+            }
+
+    def _remove(self, key: str) -> Optional[tuple]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry
+
+    def _enforce_limits(self, keep: str):
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e[2] is not None and e[2] < now]:
+            if key != keep:
+                self._remove(key)
+                self.counters["expirations"] += 1
+
+        def over():
+            return (
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_items is not None and len(self._entries) > self.max_items)
+            )
+
+        while over() and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                key = next(iter(self._entries))
+            value, _, expires = self._remove(key)
+            self.counters["evictions"] += 1
+            if self.spill_dir is not None:
+                self._spill(key, value, expires)
+
+    # -- spilling --------------------------------------------------------------
+
+    def _spill(self, key: str, value: Any, expires: Optional[float]):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        try:
+            if isinstance(value, np.ndarray) and value.dtype != object:
+                path = os.path.join(self.spill_dir, name + ".npy")
+                np.save(path, value, allow_pickle=False)
+            else:
+                path = os.path.join(self.spill_dir, name + ".pkl")
+                with open(path, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            # not picklable (or no disk space): the entry is lost
+            self.counters["spill_failures"] += 1
+            logger.warning("Could not spill cache entry %r, dropping it: %s", key, e)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        self._spilled[key] = (path, expires)
+        self.counters["spills"] += 1
+
+    def _load_spilled(self, key: str) -> tuple:
+        # remove a spilled entry from disk, returning it as (value, expires)
+        path, expires = self._spilled.pop(key)
+        try:
+            if path.endswith(".npy"):
+                return np.load(path), expires
+            with open(path, "rb") as f:
+                return pickle.load(f), expires
+        finally:
+            os.remove(path)
+
+    def _reload(self, key: str) -> Optional[tuple]:
+        value, expires = self._load_spilled(key)
+        if expires is not None and expires < time.monotonic():
+            self.counters["expirations"] += 1
+            return None
+        self.counters["reloads"] += 1
+        ttl = None if expires is None else expires - time.monotonic()
+        self.set(key, value, ttl=ttl)
+        return self._entries.get(key)
+
+    def _drop_spilled(self, key: str):
+        entry = self._spilled.pop(key, None)
+        if entry is not None and os.path.exists(entry[0]):
+            os.remove(entry[0])